@@ -5,7 +5,6 @@ from gt7dashboard import gt7helper
 from gt7dashboard.gt7lap import Lap
 from gt7dashboard.gt7performance_monitor import performance_monitor
 from gt7dashboard.gt7settings import get_log_level
-import numpy as np
 
 logger = logging.getLogger(__name__)
 logger.setLevel(get_log_level())
@@ -29,9 +28,10 @@ class RaceTimeDataTable(object):
             TableColumn(field="car_name", title="Car"),
         ]
 
-        self.lap_times_source = ColumnDataSource(
-            gt7helper.pd_data_frame_from_lap([], best_lap_time=0)
-        )
+        # Fields of the displayed columns, the table data holds only these and index
+        self._lap_cols = tuple(column.field for column in self.columns)
+
+        self.lap_times_source = ColumnDataSource(self._empty_data())
 
         dtstylesheet = ImportedStyleSheet(url="gt7dashboard/static/css/styles.css")
 
@@ -44,24 +44,36 @@ class RaceTimeDataTable(object):
             stylesheets=[dtstylesheet],
         )
 
+        # Rows already converted by show_laps, keyed by lap identity
+        self._row_cache: dict[int, tuple] = {}
+
+    def _empty_data(self) -> dict:
+        """Empty table data with a list for every displayed column"""
+        data = {"index": []}
+        for key in self._lap_cols:
+            data[key] = []
+        return data
+
     def add_lap(self, lap, doc=None):
         def do_add():
             logger.debug("RaceTimeDataTable Adding lap: %s", lap)
             lap_dict = lap.lap_to_dict()
             logger.debug("lap_dict: %s", lap_dict)
 
-            data = self.lap_times_source.data
-            for key in data.keys():
-                if key == "index":
-                    logger.debug("Skipping 'index' key")
-                    continue
-                if lap_dict.get(key, None) == None:
-                    logger.warning("Lap data missing at key: %s", key)
-                    break
-                data[key] = np.append(data[key], lap_dict.get(key, None))
-
-            self.lap_times_source.data = dict(data)
-            self.dt_lap_times.source = self.lap_times_source
+            new_row = {"index": [len(self.lap_times_source.data["index"])]}
+            missing_keys = []
+            for key in self._lap_cols:
+                value = lap_dict.get(key)
+                if value is None:
+                    missing_keys.append(key)
+                new_row[key] = [value]
+            if missing_keys:
+                logger.warning("Lap data missing at keys: %s", missing_keys)
+                return
+
+            # Stream a single row instead of re-assigning every column,
+            # so only the new row is appended and sent to the browser
+            self.lap_times_source.stream(new_row)
             logger.info("Finished Lap added")
 
         if doc is not None:
@@ -74,15 +86,30 @@ class RaceTimeDataTable(object):
     def show_laps(self, laps: List[Lap]):
         best_lap = gt7helper.get_best_lap(laps)
         if best_lap is None:
-            empty_df = gt7helper.pd_data_frame_from_lap([], best_lap_time=0)
-            self.lap_times_source.data = ColumnDataSource.from_df(empty_df)
+            self.lap_times_source.data = self._empty_data()
             return
 
-        new_df = gt7helper.pd_data_frame_from_lap(
-            laps, best_lap_time=best_lap.lap_finish_time
-        )
-        self.lap_times_source.data = ColumnDataSource.from_df(new_df)
-        self.dt_lap_times.source = self.lap_times_source
+        # Only convert laps that have not been seen with this best lap time.
+        # The lap itself is kept in the cache entry to guard against id() reuse.
+        best_lap_time = best_lap.lap_finish_time
+        row_cache = {}
+        rows = []
+        for lap in laps:
+            cached = self._row_cache.get(id(lap))
+            if cached is None or cached[0] is not lap or cached[1] != best_lap_time:
+                cached = (
+                    lap,
+                    best_lap_time,
+                    gt7helper.table_row_from_lap(lap, best_lap_time),
+                )
+            row_cache[id(lap)] = cached
+            rows.append(cached[2])
+        self._row_cache = row_cache
+
+        new_data = {"index": list(range(len(rows)))}
+        for key in self._lap_cols:
+            new_data[key] = [row[key] for row in rows]
+        self.lap_times_source.data = new_data
 
     def delete_selected_laps(self):
         """
@@ -94,16 +121,19 @@ class RaceTimeDataTable(object):
             logger.info("No laps selected for deletion.")
             return
 
-        data = dict(self.lap_times_source.data)
-        for idx in sorted(selected_indices, reverse=True):
-            lap_number = self.lap_times_source.data["number"][idx]
+        idxs = sorted(selected_indices)
+        data = self.lap_times_source.data
+        for idx in idxs:
+            lap_number = data["number"][idx]
             logger.info("Deleting lap number: %d", lap_number)
             self.app.gt7comm.session.delete_lap(lap_number)
-
-            for key in data.keys():
-                data[key] = np.delete(data[key], idx)
-
             logger.info(f"Deleted lap {lap_number}.")
 
-        self.lap_times_source.data = data
+        # Keep the columns as lists, so add_lap can stream rows by extending
+        # them in place instead of np.append copying whole arrays
+        deleted = set(idxs)
+        self.lap_times_source.data = {
+            key: [value for i, value in enumerate(values) if i not in deleted]
+            for key, values in data.items()
+        }
         self.lap_times_source.selected.indices = []  # Clear selection
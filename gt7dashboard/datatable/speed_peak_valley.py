@@ -1,4 +1,5 @@
 import logging
+import numpy as np
 from bokeh.models import ColumnDataSource, TableColumn, DataTable, ImportedStyleSheet
 from gt7dashboard.gt7lap import Lap
 from gt7dashboard.gt7settings import get_log_level
@@ -7,6 +8,28 @@ logger = logging.getLogger(__name__)
 logger.setLevel(get_log_level())
 
 
+def _peak_valley(lap: Lap) -> tuple[float, float]:
+    """Return peak and valley speed of a lap, memoized on finished laps"""
+    peak = getattr(lap, "_peak", None)
+    valley = getattr(lap, "_valley", None)
+    if peak is not None and valley is not None:
+        return peak, valley
+
+    speed = lap.get_data_array("data_speed")
+    if speed.size == 0:
+        return 0, 0
+
+    peak = float(speed.max())
+    valley = float(speed.min())
+
+    # Data of a finished lap does not change anymore
+    if lap.lap_finish_time > 0:
+        lap._peak = peak
+        lap._valley = valley
+
+    return peak, valley
+
+
 class SpeedPeakValleyDataTable(object):
     def __init__(self, app):
         self.app = app
@@ -54,34 +77,27 @@ class SpeedPeakValleyDataTable(object):
             return
 
         # Get peak and valley data for last lap
-        last_peak = max(last_lap.data_speed) if last_lap.data_speed else 0
-        last_valley = min(last_lap.data_speed) if last_lap.data_speed else 0
+        last_peak, last_valley = _peak_valley(last_lap)
         last_diff = last_peak - last_valley
 
-        if reference_lap and reference_lap.data_speed:
+        if reference_lap and len(reference_lap.data_speed) > 0:
             # Get peak and valley data for reference lap
-            ref_peak = max(reference_lap.data_speed)
-            ref_valley = min(reference_lap.data_speed)
+            ref_peak, ref_valley = _peak_valley(reference_lap)
             ref_diff = ref_peak - ref_valley
 
-            # Calculate differences
-            peak_diff = last_peak - ref_peak
-            valley_diff = last_valley - ref_valley
-            speed_diff_diff = last_diff - ref_diff
+            # Format all cells in two batches, differences keep their sign
+            values = np.array(
+                [last_peak, last_valley, last_diff, ref_peak, ref_valley, ref_diff]
+            )
+            diffs = values[:3] - values[3:]
+            strs = np.char.mod("%.1f", values).tolist()
+            diff_strs = np.where(diffs == 0, "0.0", np.char.mod("%+.1f", diffs))
 
             self.speed_peak_valley_source.data = dict(
                 metric=["Peak Speed", "Valley Speed", "Speed Difference"],
-                last_lap=[f"{last_peak:.1f}", f"{last_valley:.1f}", f"{last_diff:.1f}"],
-                reference_lap=[
-                    f"{ref_peak:.1f}",
-                    f"{ref_valley:.1f}",
-                    f"{ref_diff:.1f}",
-                ],
-                difference=[
-                    f"{peak_diff:+.1f}" if peak_diff != 0 else "0.0",
-                    f"{valley_diff:+.1f}" if valley_diff != 0 else "0.0",
-                    f"{speed_diff_diff:+.1f}" if speed_diff_diff != 0 else "0.0",
-                ],
+                last_lap=strs[:3],
+                reference_lap=strs[3:],
+                difference=diff_strs.tolist(),
             )
         else:
             # Only last lap data available
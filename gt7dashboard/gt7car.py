@@ -1,6 +1,5 @@
 import logging
-import csv
-import os
+from typing import Dict, Optional
 
 
 def car_name(car_id: int) -> str:
@@ -9,42 +8,43 @@ def car_name(car_id: int) -> str:
 
 CARS_CSV_FILENAME = "db/cars.csv"
 
+# Parsed car lists by csv filename. Missing files are not cached, so a
+# cars.csv downloaded while the dashboard is running is picked up.
+_car_id_caches: Dict[str, Dict[int, str]] = {}
+
+
+def _parse_car_rows(rows):
+    for row in rows:
+        if len(row) < 2:
+            continue
+        # int() tolerates surrounding whitespace, store as int for robust matching
+        try:
+            yield int(row[0]), row[1].strip()
+        except ValueError:
+            continue
+
+
+def _load_cars_csv(filename: str) -> Optional[Dict[int, str]]:
+    import csv
+
+    try:
+        with open(filename, "r", buffering=1 << 16, newline="") as csv_file:
+            return dict(_parse_car_rows(csv.reader(csv_file, delimiter=",")))
+    except FileNotFoundError:
+        logging.info("Could not find file %s" % filename)
+        return None
+
 
 def get_car_name_for_car_id(car_id: int) -> str:
-    # check if file exists
-    if not os.path.isfile(CARS_CSV_FILENAME):
-        logging.info("Could not find file %s" % CARS_CSV_FILENAME)
-        return "CAR-ID-%d" % car_id
-
-    # Static cache dictionary
-    if not hasattr(get_car_name_for_car_id, "_car_id_cache"):
-        get_car_name_for_car_id._car_id_cache = None
-
-    # Load cache if not already loaded
-    if get_car_name_for_car_id._car_id_cache is None:
-        car_id_cache = {}
-
-        with open(CARS_CSV_FILENAME, "r") as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=",")
-            for row in csv_reader:
-                if len(row) >= 2:
-                    # Strip whitespace and store as int for robust matching
-                    try:
-                        key = int(row[0].strip())
-                        car_id_cache[key] = row[1].strip()
-                    except ValueError:
-                        continue
-        get_car_name_for_car_id._car_id_cache = car_id_cache
-    else:
-        car_id_cache = get_car_name_for_car_id._car_id_cache
+    car_id_cache = _car_id_caches.get(CARS_CSV_FILENAME)
+    if car_id_cache is None:
+        car_id_cache = _load_cars_csv(CARS_CSV_FILENAME)
+        if car_id_cache is None:
+            return f"CAR-ID-{car_id}"
+        _car_id_caches[CARS_CSV_FILENAME] = car_id_cache
 
     # Look up car_id as int
     try:
-        car_id_int = int(car_id)
-    except ValueError:
-        return f"CAR-ID-{car_id}"
-
-    if car_id_int in car_id_cache:
-        return car_id_cache[car_id_int]
-    else:
+        return car_id_cache[int(car_id)]
+    except (KeyError, ValueError, TypeError):
         return f"CAR-ID-{car_id}"
@@ -1,9 +1,7 @@
 import datetime
 import logging
 import socket
-import struct
 import time
-import copy
 import threading
 from threading import Thread
 from typing import Optional, Callable, Any
@@ -12,13 +10,18 @@ from gt7dashboard.gt7helper import seconds_to_lap_time
 from gt7dashboard.gt7lap import Lap
 from gt7dashboard.gt7data import GT7Data
 from gt7dashboard.gt7session import GT7Session
-from gt7dashboard.gt7salsa import salsa20_dec
+from gt7dashboard.gt7salsa import salsa20_dec_into
 from .gt7settings import get_log_level
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logger.setLevel(get_log_level())
 
+# Seconds between heartbeats, the PlayStation stops sending without them
+HEARTBEAT_INTERVAL = 1.0
+# Requested socket receive buffer, the OS may cap it
+RECEIVE_BUFFER_SIZE = 2 * 1024 * 1024
+
 
 class GT7Communication(Thread):
     def __init__(self, playstation_ip: str):
@@ -52,10 +55,15 @@ class GT7Communication(Thread):
         self.send_port = 33739
         self.receive_port = 33740
         self._last_time_data_received = 0
+        self._was_connected = False
+        # Packets are received and decrypted in place in this buffer
+        self._packet_buffer = bytearray(4096)
 
         self.current_lap = Lap()
         self.session = GT7Session()
         self.last_data = GT7Data(None)
+        # Set once last_data holds a received packet
+        self._data_received = threading.Event()
 
         # This is used to record race data in any case. This will override the "in_race" flag.
         # When recording data. Useful when recording replays.
@@ -65,8 +73,8 @@ class GT7Communication(Thread):
         """Register a callback to be called when connection is established."""
         self._on_connected_callback = callback
 
-    def _check_connection_event(self):
-        connected = self.is_connected()
+    def _check_connection_event(self, now: Optional[float] = None):
+        connected = self.is_connected(now)
         if connected and not self._was_connected:
             if self._on_connected_callback:
                 self._on_connected_callback()
@@ -148,7 +156,9 @@ class GT7Communication(Thread):
 
             except Exception as e:
                 logger.error(
-                    f"Unexpected error in GT7Communication: {e}", exc_info=True
+                    "Unexpected error in GT7Communication: %s",
+                    e,
+                    exc_info=logger.isEnabledFor(logging.DEBUG),
                 )
                 if not self._handle_general_failure(
                     connection_attempts, base_retry_delay
@@ -179,6 +189,9 @@ class GT7Communication(Thread):
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            # Room for bursts of packets while a lap is finished or the GC runs
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+            self._log_receive_buffer_size(s)
 
             if self.playstation_ip == "255.255.255.255":
                 s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
@@ -190,6 +203,21 @@ class GT7Communication(Thread):
             logger.error(f"Failed to create socket: {e}")
             raise ConnectionError(f"Unable to bind to port {self.receive_port}") from e
 
+    @staticmethod
+    def _log_receive_buffer_size(s: socket.socket) -> None:
+        """Log the receive buffer size granted by the OS"""
+        # Linux reports twice the usable size, it is capped by net.core.rmem_max
+        granted = s.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        if granted < RECEIVE_BUFFER_SIZE:
+            logger.info(
+                "Socket receive buffer is %d bytes instead of %d, "
+                "raise net.core.rmem_max on Linux for a larger buffer",
+                granted,
+                RECEIVE_BUFFER_SIZE,
+            )
+        else:
+            logger.debug("Socket receive buffer is %d bytes", granted)
+
     def _cleanup_socket(self, s: Optional[socket.socket]) -> None:
         """Safely cleanup socket resources"""
         if s:
@@ -201,20 +229,24 @@ class GT7Communication(Thread):
     def _run_communication_loop(self, s: socket.socket) -> None:
         previous_lap = -1
         package_id = 0
-        package_nr = 0
+        next_heartbeat = 0.0
+        packet_view = memoryview(self._packet_buffer)
         self._check_connection_event()
         while not self._shall_restart and self._shall_run:
             try:
-                data, address = s.recvfrom(4096)
-                package_nr = package_nr + 1
-                ddata = salsa20_dec(data)
-                if (
-                    len(ddata) > 0
-                    and struct.unpack("i", ddata[0x70 : 0x70 + 4])[0] > package_id
-                ):
+                nbytes, address = s.recvfrom_into(self._packet_buffer)
+                # Decrypt in place, the packet is parsed before the next receive.
+                # Packets that are not newer are rejected before decrypting all.
+                ddata = salsa20_dec_into(
+                    packet_view[:nbytes], self._packet_buffer, newer_than=package_id
+                )
+                if len(ddata) > 0:
 
                     self.last_data = GT7Data(ddata)
-                    self._last_time_data_received = time.time()
+                    if not self._data_received.is_set():
+                        self._data_received.set()
+                    now = time.monotonic()
+                    self._last_time_data_received = now
 
                     package_id = self.last_data.package_id
                     bstlap = self.last_data.best_lap
@@ -245,17 +277,17 @@ class GT7Communication(Thread):
 
                     self._log_data(self.last_data)
 
-                    if package_nr > 100:
+                    if now >= next_heartbeat:
                         self._send_hb(s)
-                        package_nr = 0
-                        self._check_connection_event()
+                        next_heartbeat = now + HEARTBEAT_INTERVAL
+                        self._check_connection_event(now)
 
             except (OSError, TimeoutError) as e:
-                package_nr = 0
                 # Reset package id for new connections
                 package_id = 0
                 # Handler for package exceptions
                 self._send_hb(s)
+                next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
 
     def restart(self):
         self._shall_restart = True
@@ -267,31 +299,30 @@ class GT7Communication(Thread):
 
     def _send_hb(self, s: socket.socket) -> None:
         """Send heartbeat to PlayStation"""
-        send_data = "A"
-        s.sendto(send_data.encode("utf-8"), (self.playstation_ip, self.send_port))
+        s.sendto(b"A", (self.playstation_ip, self.send_port))
         # Raise the heartbeat event for consumers
         if self._on_heartbeat_callback:
             self._on_heartbeat_callback()
 
-    def is_connected(self) -> bool:
-        """Check if currently connected to GT7"""
+    def is_connected(self, now: Optional[float] = None) -> bool:
+        """Check if currently connected to GT7, now is a time.monotonic() value"""
+        if now is None:
+            now = time.monotonic()
         return (
             self._last_time_data_received > 0
-            and (time.time() - self._last_time_data_received) <= 1
+            and (now - self._last_time_data_received) <= 1
         )
 
     def get_last_data(self) -> Optional[GT7Data]:
         """Get the last received GT7 data with timeout"""
-        timeout = time.time() + 5  # 5 seconds timeout
-        while True:
-            with self._data_lock:
-                if self.last_data is not None:
-                    return copy.deepcopy(self.last_data)
+        # 5 seconds timeout
+        if not self._data_received.wait(timeout=5):
+            logger.warning("Timeout while waiting for last data")
+            return None
 
-            if time.time() > timeout:
-                logger.warning("Timeout while waiting for last data")
-                return None
-            time.sleep(0.01)
+        # A GT7Data is never modified after parsing, a new one is created for
+        # every packet. The reference can be shared without copying it.
+        return self.last_data
 
     def set_on_lapfinish_callback(
         self, new_lap_callback: Optional[Callable[[Lap], None]]
@@ -306,6 +337,7 @@ class GT7Communication(Thread):
         self.current_lap = Lap()
         self.session.reset()
         self.last_data = GT7Data(None)
+        self._data_received.clear()
         if self._on_reset_callback:
             self._on_reset_callback()
 
@@ -364,96 +396,89 @@ class GT7Communication(Thread):
 
     def _process_lap_data(self, data: GT7Data) -> None:
         """Process and store lap data from GT7"""
-        if data.ride_height < self.session.min_body_height:
-            self.session.min_body_height = data.ride_height
+        # Local names for the values used several times per tick
+        lap = self.current_lap
+        session = self.session
+        speed = data.car_speed
+        throttle = data.throttle
+        brake = data.brake
 
-        if data.car_speed > self.session.max_speed:
-            self.session.max_speed = data.car_speed
+        if data.ride_height < session.min_body_height:
+            session.min_body_height = data.ride_height
 
-        if data.throttle == 100:
-            self.current_lap.full_throttle_ticks += 1
+        if speed > session.max_speed:
+            session.max_speed = speed
 
-        if data.brake == 100:
-            self.current_lap.full_brake_ticks += 1
+        # Conditions count as 0 or 1 ticks
+        lap.full_throttle_ticks += throttle == 100
+        lap.full_brake_ticks += brake == 100
 
-        if data.brake == 0 and data.throttle == 0:
-            self.current_lap.no_throttle_and_no_brake_ticks += 1
-            self.current_lap.data_coasting.append(1)
-        else:
-            self.current_lap.data_coasting.append(0)
+        coasting = int(brake == 0 and throttle == 0)
+        lap.no_throttle_and_no_brake_ticks += coasting
+        lap.data_coasting.append(coasting)
 
-        if data.brake > 0 and data.throttle > 0:
-            self.current_lap.throttle_and_brake_ticks += 1
+        lap.throttle_and_brake_ticks += brake > 0 and throttle > 0
 
-        self.current_lap.in_race = data.in_race
-        self.current_lap.lap_ticks += 1
+        lap.in_race = data.in_race
+        lap.lap_ticks += 1
 
-        if (
-            data.tyre_temp_FL > 100
-            or data.tyre_temp_FR > 100
-            or data.tyre_temp_RL > 100
-            or data.tyre_temp_RR > 100
-        ):
-            self.current_lap.tyres_overheated_ticks += 1
+        tyre_temp_max = max(
+            data.tyre_temp_FL, data.tyre_temp_FR, data.tyre_temp_RL, data.tyre_temp_RR
+        )
+        lap.tyres_overheated_ticks += tyre_temp_max > 100
 
-        self.current_lap.data_braking.append(data.brake)
-        self.current_lap.data_throttle.append(data.throttle)
-        self.current_lap.data_speed.append(data.car_speed)
+        lap.data_braking.append(brake)
+        lap.data_throttle.append(throttle)
+        lap.data_speed.append(speed)
 
-        delta_divisor = data.car_speed
-        if data.car_speed == 0:
-            delta_divisor = 1
+        # Tyre speed relative to car speed, one division for all four tyres
+        inv_divisor = 1.0 / (speed if speed != 0 else 1)
 
-        delta_fl = data.type_speed_FL / delta_divisor
-        delta_fr = data.type_speed_FR / delta_divisor
-        delta_rl = data.type_speed_RL / delta_divisor
-        delta_rr = data.type_speed_FR / delta_divisor
+        delta_fl = data.type_speed_FL * inv_divisor
+        delta_fr = data.type_speed_FR * inv_divisor
+        delta_rl = data.type_speed_RL * inv_divisor
+        delta_rr = data.tyre_speed_RR * inv_divisor
 
-        if delta_fl > 1.1 or delta_fr > 1.1 or delta_rl > 1.1 or delta_rr > 1.1:
-            self.current_lap.tyres_spinning_ticks += 1
+        lap.tyres_spinning_ticks += max(delta_fl, delta_fr, delta_rl, delta_rr) > 1.1
 
-        self.current_lap.data_tyres.append(delta_fl + delta_fr + delta_rl + delta_rr)
+        lap.data_tyres.append(delta_fl + delta_fr + delta_rl + delta_rr)
 
         ## RPM and shifting
 
-        self.current_lap.data_rpm.append(data.rpm)
-        self.current_lap.data_gear.append(data.current_gear)
+        lap.data_rpm.append(data.rpm)
+        lap.data_gear.append(data.current_gear)
 
         ## Log Position
 
-        self.current_lap.data_position_x.append(data.position_x)
-        self.current_lap.data_position_y.append(data.position_y)
-        self.current_lap.data_position_z.append(data.position_z)
+        lap.data_position_x.append(data.position_x)
+        lap.data_position_y.append(data.position_y)
+        lap.data_position_z.append(data.position_z)
 
         ## Log Boost
 
-        self.current_lap.data_boost.append(data.boost)
+        lap.data_boost.append(data.boost)
 
         ## Log Yaw Rate
 
         # This is the interval to collection yaw rate
         interval = 1 * 60  # 1 second has 60 fps and 60 data ticks
-        self.current_lap.data_rotation_yaw.append(data.rotation_yaw)
+        lap.data_rotation_yaw.append(data.rotation_yaw)
 
         # Collect yaw rate, skip first interval with all zeroes
-        if len(self.current_lap.data_rotation_yaw) > interval:
-            yaw_rate_per_second = (
-                data.rotation_yaw - self.current_lap.data_rotation_yaw[-interval]
-            )
+        if len(lap.data_rotation_yaw) > interval:
+            yaw_rate_per_second = data.rotation_yaw - lap.data_rotation_yaw[-interval]
         else:
             yaw_rate_per_second = 0
 
-        self.current_lap.data_absolute_yaw_rate_per_second.append(
-            abs(yaw_rate_per_second)
-        )
+        lap.data_absolute_yaw_rate_per_second.append(abs(yaw_rate_per_second))
 
         # Adapted from https://www.gtplanet.net/forum/threads/gt7-is-compatible-with-motion-rig.410728/post-13810797
-        self.current_lap.lap_live_time = (self.current_lap.lap_ticks * 1.0 / 60.0) - (
-            self.session.special_packet_time / 1000.0
+        lap.lap_live_time = (lap.lap_ticks * 1.0 / 60.0) - (
+            session.special_packet_time / 1000.0
         )
 
-        self.current_lap.data_time.append(self.current_lap.lap_live_time)
-        self.current_lap.car_id = data.car_id
+        lap.data_time.append(lap.lap_live_time)
+        lap.car_id = data.car_id
 
     def finish_lap(self, manual: bool = False) -> None:
         """Finishes a lap with proper thread safety"""
@@ -469,17 +494,21 @@ class GT7Communication(Thread):
                 logger.warning("No valid lap data to finish")
                 return
 
-            # Create a deep copy for callback to prevent race conditions
-            lap_copy = None
+            # The finished lap is handed to the callback, the communication
+            # thread continues with a new Lap and never touches it again
+            finished_lap = None
 
             try:
-                # Manual laps have no time assigned, so take current live time as lap finish time.
-                # Finish time is tracked in seconds while live time is tracked in ms
-                self.current_lap.lap_finish_time = self.current_lap.lap_live_time * 1000
-
-                # Regular finished laps (crossing the finish line in races or time trials)
-                # have their lap time stored in last_lap
-                self.current_lap.lap_finish_time = self.last_data.last_lap
+                if manual:
+                    # Manual laps have no time assigned, so take current live time as lap finish time.
+                    # Live time is tracked in seconds while finish time is tracked in ms
+                    self.current_lap.lap_finish_time = (
+                        self.current_lap.lap_live_time * 1000
+                    )
+                else:
+                    # Regular finished laps (crossing the finish line in races or time trials)
+                    # have their lap time stored in last_lap
+                    self.current_lap.lap_finish_time = self.last_data.last_lap
 
                 # Track recording meta data
                 self.current_lap.is_replay = not self.always_record_data
@@ -490,7 +519,6 @@ class GT7Communication(Thread):
                 self.current_lap.fuel_consumed = (
                     self.current_lap.fuel_at_start - self.current_lap.fuel_at_end
                 )
-                self.current_lap.lap_finish_time = self.current_lap.lap_finish_time
                 self.current_lap.total_laps = self.last_data.total_laps
                 self.current_lap.title = seconds_to_lap_time(
                     self.current_lap.lap_finish_time / 1000
@@ -513,7 +541,7 @@ class GT7Communication(Thread):
                     and len(self.current_lap.data_speed) > 0
                 ):
                     self.session.add_lap(self.current_lap)
-                    lap_copy = copy.deepcopy(self.current_lap)
+                    finished_lap = self.current_lap
 
                 # Reset current lap with an empty one
                 self.current_lap = Lap()
@@ -521,15 +549,24 @@ class GT7Communication(Thread):
                     self.current_lap.fuel_at_start = self.last_data.current_fuel
 
             except Exception as e:
-                logger.error(f"Error finishing lap: {e}", exc_info=True)
+                # Tracebacks only with debug logging, this may repeat every lap
+                logger.error(
+                    "Error finishing lap: %s",
+                    e,
+                    exc_info=logger.isEnabledFor(logging.DEBUG),
+                )
                 return
 
         # Call callback outside the lock to prevent deadlocks
-        if lap_copy and self._on_lapfinish_callback:
+        if finished_lap and self._on_lapfinish_callback:
             try:
-                self._on_lapfinish_callback(lap_copy)
+                self._on_lapfinish_callback(finished_lap)
             except Exception as e:
-                logger.error(f"Error in lap callback: {e}", exc_info=True)
+                logger.error(
+                    "Error in lap callback: %s",
+                    e,
+                    exc_info=logger.isEnabledFor(logging.DEBUG),
+                )
 
     def _handle_connection_failure(self, attempts: int, base_delay: float) -> bool:
         """Handle connection failures with backoff strategy"""
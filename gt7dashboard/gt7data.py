@@ -4,7 +4,115 @@ from datetime import timedelta
 from typing import Optional
 
 
+# Layout of a decrypted telemetry packet, unknown and unused bytes are skipped
+PACKET_STRUCT = struct.Struct(
+    "<"
+    "4x"  # 0x00 magic
+    "3f"  # 0x04 position x, y, z
+    "3f"  # 0x10 velocity x, y, z
+    "3f"  # 0x1C rotation pitch, yaw, roll
+    "4x"  # 0x28 orientation relative to north
+    "3f"  # 0x2C angular velocity x, y, z
+    "f"  # 0x38 ride height
+    "f"  # 0x3C rpm
+    "4x"  # 0x40 salsa20 iv
+    "7f"  # 0x44 fuel, fuel capacity, speed, boost, oil pressure, water and oil temp
+    "4f"  # 0x60 tyre temperatures FL, FR, RL, RR
+    "i"  # 0x70 package id
+    "2h"  # 0x74 current lap, total laps
+    "3i"  # 0x78 best lap, last lap, time on track
+    "2h"  # 0x84 current position, total positions
+    "2H"  # 0x88 rev warning, rev limiter
+    "h"  # 0x8C estimated top speed
+    "B"  # 0x8E flags
+    "x"
+    "3B"  # 0x90 gears, throttle, brake
+    "17x"
+    "4f"  # 0xA4 wheel revolutions per second FL, FR, RL, RR
+    "4f"  # 0xB4 tyre diameters FL, FR, RL, RR
+    "4f"  # 0xC4 suspension FL, FR, RL, RR
+    "32x"
+    "3f"  # 0xF4 clutch, clutch engaged, rpm after clutch
+    "4x"
+    "8f"  # 0x104 gear ratios 1 to 8
+    "i"  # 0x124 car id
+)
+
+
 class GT7Data:
+    __slots__ = (
+        "position_x",
+        "position_y",
+        "position_z",
+        "velocity_x",
+        "velocity_y",
+        "velocity_z",
+        "rotation_pitch",
+        "rotation_yaw",
+        "rotation_roll",
+        "angular_velocity_x",
+        "angular_velocity_y",
+        "angular_velocity_z",
+        "rpm",
+        "current_fuel",
+        "fuel_capacity",
+        "oil_pressure",
+        "water_temp",
+        "oil_temp",
+        "tyre_temp_FL",
+        "tyre_temp_FR",
+        "tyre_temp_RL",
+        "tyre_temp_RR",
+        "package_id",
+        "current_lap",
+        "total_laps",
+        "best_lap",
+        "last_lap",
+        "current_position",
+        "total_positions",
+        "rpm_rev_warning",
+        "rpm_rev_limiter",
+        "estimated_top_speed",
+        "tyre_diameter_FL",
+        "tyre_diameter_FR",
+        "tyre_diameter_RL",
+        "tyre_diameter_RR",
+        "suspension_fl",
+        "suspension_fr",
+        "suspension_rl",
+        "suspension_rr",
+        "clutch",
+        "clutch_engaged",
+        "rpm_after_clutch",
+        "gear_1",
+        "gear_2",
+        "gear_3",
+        "gear_4",
+        "gear_5",
+        "gear_6",
+        "gear_7",
+        "gear_8",
+        "car_id",
+        "current_gear",
+        "suggested_gear",
+        "boost",
+        "type_speed_FL",
+        "type_speed_FR",
+        "type_speed_RL",
+        "tyre_speed_RR",
+        "car_speed",
+        "tyre_slip_ratio_FL",
+        "tyre_slip_ratio_FR",
+        "tyre_slip_ratio_RL",
+        "tyre_slip_ratio_RR",
+        "time_on_track",
+        "throttle",
+        "brake",
+        "ride_height",
+        "is_paused",
+        "in_race",
+    )
+
     def __init__(self, ddata: Optional[bytes]):
         # Type annotations for all attributes
         self.package_id: int
@@ -110,35 +218,83 @@ class GT7Data:
         if not ddata:
             return
 
-        self.package_id = struct.unpack("i", ddata[0x70 : 0x70 + 4])[0]
-        self.best_lap = struct.unpack("i", ddata[0x78 : 0x78 + 4])[0]
-        self.last_lap = struct.unpack("i", ddata[0x7C : 0x7C + 4])[0]
-        self.current_lap = struct.unpack("h", ddata[0x74 : 0x74 + 2])[0]
-        self.current_gear = struct.unpack("B", ddata[0x90 : 0x90 + 1])[0] & 0b00001111
-        self.suggested_gear = struct.unpack("B", ddata[0x90 : 0x90 + 1])[0] >> 4
-        self.fuel_capacity = struct.unpack("f", ddata[0x48 : 0x48 + 4])[0]
-        self.current_fuel = struct.unpack("f", ddata[0x44 : 0x44 + 4])[0]
-        self.boost = struct.unpack("f", ddata[0x50 : 0x50 + 4])[0] - 1
-
-        self.tyre_diameter_FL = struct.unpack("f", ddata[0xB4 : 0xB4 + 4])[0]
-        self.tyre_diameter_FR = struct.unpack("f", ddata[0xB8 : 0xB8 + 4])[0]
-        self.tyre_diameter_RL = struct.unpack("f", ddata[0xBC : 0xBC + 4])[0]
-        self.tyre_diameter_RR = struct.unpack("f", ddata[0xC0 : 0xC0 + 4])[0]
-
-        self.type_speed_FL = abs(
-            3.6 * self.tyre_diameter_FL * struct.unpack("f", ddata[0xA4 : 0xA4 + 4])[0]
-        )
-        self.type_speed_FR = abs(
-            3.6 * self.tyre_diameter_FR * struct.unpack("f", ddata[0xA8 : 0xA8 + 4])[0]
-        )
-        self.type_speed_RL = abs(
-            3.6 * self.tyre_diameter_RL * struct.unpack("f", ddata[0xAC : 0xAC + 4])[0]
-        )
-        self.tyre_speed_RR = abs(
-            3.6 * self.tyre_diameter_RR * struct.unpack("f", ddata[0xB0 : 0xB0 + 4])[0]
-        )
-
-        self.car_speed = 3.6 * struct.unpack("f", ddata[0x4C : 0x4C + 4])[0]
+        (
+            self.position_x,
+            self.position_y,
+            self.position_z,
+            self.velocity_x,
+            self.velocity_y,
+            self.velocity_z,
+            self.rotation_pitch,
+            self.rotation_yaw,
+            self.rotation_roll,
+            self.angular_velocity_x,
+            self.angular_velocity_y,
+            self.angular_velocity_z,
+            ride_height,
+            self.rpm,
+            self.current_fuel,
+            self.fuel_capacity,
+            car_speed,
+            boost,
+            self.oil_pressure,
+            self.water_temp,
+            self.oil_temp,
+            self.tyre_temp_FL,
+            self.tyre_temp_FR,
+            self.tyre_temp_RL,
+            self.tyre_temp_RR,
+            self.package_id,
+            self.current_lap,
+            self.total_laps,
+            self.best_lap,
+            self.last_lap,
+            time_on_track,
+            self.current_position,
+            self.total_positions,
+            self.rpm_rev_warning,
+            self.rpm_rev_limiter,
+            self.estimated_top_speed,
+            flags,
+            gears,
+            throttle,
+            brake,
+            wheel_rps_FL,
+            wheel_rps_FR,
+            wheel_rps_RL,
+            wheel_rps_RR,
+            self.tyre_diameter_FL,
+            self.tyre_diameter_FR,
+            self.tyre_diameter_RL,
+            self.tyre_diameter_RR,
+            self.suspension_fl,
+            self.suspension_fr,
+            self.suspension_rl,
+            self.suspension_rr,
+            self.clutch,
+            self.clutch_engaged,
+            self.rpm_after_clutch,
+            self.gear_1,
+            self.gear_2,
+            self.gear_3,
+            self.gear_4,
+            self.gear_5,
+            self.gear_6,
+            self.gear_7,
+            self.gear_8,
+            self.car_id,
+        ) = PACKET_STRUCT.unpack_from(ddata)
+
+        self.current_gear = gears & 0b00001111
+        self.suggested_gear = gears >> 4
+        self.boost = boost - 1
+
+        self.type_speed_FL = abs(3.6 * self.tyre_diameter_FL * wheel_rps_FL)
+        self.type_speed_FR = abs(3.6 * self.tyre_diameter_FR * wheel_rps_FR)
+        self.type_speed_RL = abs(3.6 * self.tyre_diameter_RL * wheel_rps_RL)
+        self.tyre_speed_RR = abs(3.6 * self.tyre_diameter_RR * wheel_rps_RR)
+
+        self.car_speed = 3.6 * car_speed
 
         if self.car_speed > 0:
             self.tyre_slip_ratio_FL = "{:6.2f}".format(
@@ -154,75 +310,15 @@ class GT7Data:
                 self.tyre_speed_RR / self.car_speed
             )
 
-        self.time_on_track = timedelta(
-            seconds=round(struct.unpack("i", ddata[0x80 : 0x80 + 4])[0] / 1000)
-        )
-
-        self.total_laps = struct.unpack("h", ddata[0x76 : 0x76 + 2])[0]
-
-        self.current_position = struct.unpack("h", ddata[0x84 : 0x84 + 2])[0]
-        self.total_positions = struct.unpack("h", ddata[0x86 : 0x86 + 2])[0]
-
-        self.car_id = struct.unpack("i", ddata[0x124 : 0x124 + 4])[0]
-
-        self.throttle = struct.unpack("B", ddata[0x91 : 0x91 + 1])[0] / 2.55
-        self.rpm = struct.unpack("f", ddata[0x3C : 0x3C + 4])[0]
-        self.rpm_rev_warning = struct.unpack("H", ddata[0x88 : 0x88 + 2])[0]
-        self.rpm_rev_limiter = struct.unpack("H", ddata[0x8A : 0x8A + 2])[0]
-
-        self.brake = struct.unpack("B", ddata[0x92 : 0x92 + 1])[0] / 2.55
-
-        self.boost = struct.unpack("f", ddata[0x50 : 0x50 + 4])[0] - 1
-
-        self.estimated_top_speed = struct.unpack("h", ddata[0x8C : 0x8C + 2])[0]
-
-        self.clutch = struct.unpack("f", ddata[0xF4 : 0xF4 + 4])[0]
-        self.clutch_engaged = struct.unpack("f", ddata[0xF8 : 0xF8 + 4])[0]
-        self.rpm_after_clutch = struct.unpack("f", ddata[0xFC : 0xFC + 4])[0]
-
-        self.oil_temp = struct.unpack("f", ddata[0x5C : 0x5C + 4])[0]
-        self.water_temp = struct.unpack("f", ddata[0x58 : 0x58 + 4])[0]
-
-        self.oil_pressure = struct.unpack("f", ddata[0x54 : 0x54 + 4])[0]
-        self.ride_height = 1000 * struct.unpack("f", ddata[0x38 : 0x38 + 4])[0]
-
-        self.tyre_temp_FL = struct.unpack("f", ddata[0x60 : 0x60 + 4])[0]
-        self.tyre_temp_FR = struct.unpack("f", ddata[0x64 : 0x64 + 4])[0]
-        self.tyre_temp_RL = struct.unpack("f", ddata[0x68 : 0x68 + 4])[0]
-        self.tyre_temp_RR = struct.unpack("f", ddata[0x6C : 0x6C + 4])[0]
-
-        self.suspension_fl = struct.unpack("f", ddata[0xC4 : 0xC4 + 4])[0]
-        self.suspension_fr = struct.unpack("f", ddata[0xC8 : 0xC8 + 4])[0]
-        self.suspension_rl = struct.unpack("f", ddata[0xCC : 0xCC + 4])[0]
-        self.suspension_rr = struct.unpack("f", ddata[0xD0 : 0xD0 + 4])[0]
-
-        self.gear_1 = struct.unpack("f", ddata[0x104 : 0x104 + 4])[0]
-        self.gear_2 = struct.unpack("f", ddata[0x108 : 0x108 + 4])[0]
-        self.gear_3 = struct.unpack("f", ddata[0x10C : 0x10C + 4])[0]
-        self.gear_4 = struct.unpack("f", ddata[0x110 : 0x110 + 4])[0]
-        self.gear_5 = struct.unpack("f", ddata[0x114 : 0x114 + 4])[0]
-        self.gear_6 = struct.unpack("f", ddata[0x118 : 0x118 + 4])[0]
-        self.gear_7 = struct.unpack("f", ddata[0x11C : 0x11C + 4])[0]
-        self.gear_8 = struct.unpack("f", ddata[0x120 : 0x120 + 4])[0]
-
-        self.position_x = struct.unpack("f", ddata[0x04 : 0x04 + 4])[0]
-        self.position_y = struct.unpack("f", ddata[0x08 : 0x08 + 4])[0]
-        self.position_z = struct.unpack("f", ddata[0x0C : 0x0C + 4])[0]
-
-        self.velocity_x = struct.unpack("f", ddata[0x10 : 0x10 + 4])[0]
-        self.velocity_y = struct.unpack("f", ddata[0x14 : 0x14 + 4])[0]
-        self.velocity_z = struct.unpack("f", ddata[0x18 : 0x18 + 4])[0]
+        self.time_on_track = timedelta(seconds=round(time_on_track / 1000))
 
-        self.rotation_pitch = struct.unpack("f", ddata[0x1C : 0x1C + 4])[0]
-        self.rotation_yaw = struct.unpack("f", ddata[0x20 : 0x20 + 4])[0]
-        self.rotation_roll = struct.unpack("f", ddata[0x24 : 0x24 + 4])[0]
+        self.throttle = throttle / 2.55
+        self.brake = brake / 2.55
 
-        self.angular_velocity_x = struct.unpack("f", ddata[0x2C : 0x2C + 4])[0]
-        self.angular_velocity_y = struct.unpack("f", ddata[0x30 : 0x30 + 4])[0]
-        self.angular_velocity_z = struct.unpack("f", ddata[0x34 : 0x34 + 4])[0]
+        self.ride_height = 1000 * ride_height
 
-        self.is_paused = bin(struct.unpack("B", ddata[0x8E : 0x8E + 1])[0])[-2] == "1"
-        self.in_race = bin(struct.unpack("B", ddata[0x8E : 0x8E + 1])[0])[-1] == "1"
+        self.is_paused = flags & 0b10 != 0
+        self.in_race = flags & 0b01 != 0
 
     def to_json(self) -> str:
         return json.dumps(self, indent=4, sort_keys=True, default=str)
@@ -1,10 +1,28 @@
-from bokeh.models import ColumnDataSource, Label
+import weakref
+
+import numpy as np
+from bokeh.models import ColumnDataSource, Label, LabelSet
 from bokeh.plotting import figure
 
 from gt7dashboard import gt7helper
 from gt7dashboard.gt7lap import Lap
 from gt7dashboard.gt7helper import seconds_to_lap_time
 
+# Names of the LabelSets holding the speed peaks and valleys on the race line
+LAST_LAP_LABELS_NAME = "last_lap_peaks_and_valleys"
+REFERENCE_LAP_LABELS_NAME = "reference_lap_peaks_and_valleys"
+
+# Laps last annotated on each race line figure
+_annotated_laps_by_race_line = weakref.WeakKeyDictionary()
+
+
+def _empty_race_line_source(mode: str) -> ColumnDataSource:
+    # Filling data after construction is cheaper than passing data= to the
+    # ColumnDataSource constructor.
+    source = ColumnDataSource()
+    source.data.update({f"raceline_z_{mode}": [], f"raceline_x_{mode}": []})
+    return source
+
 
 def get_throttle_braking_race_line_diagram():
     # TODO Make this work, tooltips just show breakpoint
@@ -32,9 +50,7 @@ def get_throttle_braking_race_line_diagram():
         legend_label="Throttle Last Lap",
         line_width=5,
         color="green",
-        source=ColumnDataSource(
-            data={"raceline_z_throttle": [], "raceline_x_throttle": []}
-        ),
+        source=_empty_race_line_source("throttle"),
     )
     breaking_line = s_race_line.line(
         x="raceline_x_braking",
@@ -42,9 +58,7 @@ def get_throttle_braking_race_line_diagram():
         legend_label="Braking Last Lap",
         line_width=5,
         color="red",
-        source=ColumnDataSource(
-            data={"raceline_z_braking": [], "raceline_x_braking": []}
-        ),
+        source=_empty_race_line_source("braking"),
     )
 
     coasting_line = s_race_line.line(
@@ -53,9 +67,7 @@ def get_throttle_braking_race_line_diagram():
         legend_label="Coasting Last Lap",
         line_width=5,
         color="cyan",
-        source=ColumnDataSource(
-            data={"raceline_z_coasting": [], "raceline_x_coasting": []}
-        ),
+        source=_empty_race_line_source("coasting"),
     )
 
     # Reference Lap
@@ -67,9 +79,7 @@ def get_throttle_braking_race_line_diagram():
         line_width=15,
         alpha=0.3,
         color="green",
-        source=ColumnDataSource(
-            data={"raceline_z_throttle": [], "raceline_x_throttle": []}
-        ),
+        source=_empty_race_line_source("throttle"),
     )
     reference_breaking_line = s_race_line.line(
         x="raceline_x_braking",
@@ -78,9 +88,7 @@ def get_throttle_braking_race_line_diagram():
         line_width=15,
         alpha=0.3,
         color="red",
-        source=ColumnDataSource(
-            data={"raceline_z_braking": [], "raceline_x_braking": []}
-        ),
+        source=_empty_race_line_source("braking"),
     )
 
     reference_coasting_line = s_race_line.line(
@@ -90,9 +98,13 @@ def get_throttle_braking_race_line_diagram():
         line_width=15,
         alpha=0.3,
         color="cyan",
-        source=ColumnDataSource(
-            data={"raceline_z_coasting": [], "raceline_x_coasting": []}
-        ),
+        source=_empty_race_line_source("coasting"),
+    )
+
+    # Peak and valley labels of the last and the reference lap
+    _get_peaks_and_valleys_label_set(s_race_line, LAST_LAP_LABELS_NAME, color="cyan")
+    _get_peaks_and_valleys_label_set(
+        s_race_line, REFERENCE_LAP_LABELS_NAME, color="magenta"
     )
 
     s_race_line.legend.visible = True
@@ -115,32 +127,61 @@ def get_throttle_braking_race_line_diagram():
 def add_annotations_to_race_line(race_line: figure, last_lap: Lap, reference_lap: Lap):
     """Adds annotations such as speed peaks and valleys and the starting line to the racing line"""
 
+    # Skip the update if the figure already shows these laps. The laps are
+    # kept in the key, so a new lap can not reuse the id of an old one.
+    annotated_laps = (
+        last_lap,
+        len(last_lap.data_position_x),
+        reference_lap,
+        len(reference_lap.data_position_x),
+    )
+    if _annotated_laps_by_race_line.get(race_line) == annotated_laps:
+        return
+    _annotated_laps_by_race_line[race_line] = annotated_laps
+
     remove_all_annotation_text_from_figure(race_line)
 
-    decorations = []
-    decorations.extend(
-        _add_peaks_and_valley_decorations_for_lap(
-            last_lap, race_line, color="cyan", offset=0
-        )
-    )
-    decorations.extend(
-        _add_peaks_and_valley_decorations_for_lap(
-            reference_lap, race_line, color="magenta", offset=0
-        )
-    )
+    # Peaks and valleys of a lap are one LabelSet backed by one data source.
+    # Replacing its data is a single model change, instead of one Label model
+    # per position being serialized and sent to the browser.
+    # With around 20 positions, separate Labels took 27s before.
+    _get_peaks_and_valleys_label_set(
+        race_line, LAST_LAP_LABELS_NAME, color="cyan"
+    ).source.data = _get_peaks_and_valley_labels_for_lap(last_lap)
+    _get_peaks_and_valleys_label_set(
+        race_line, REFERENCE_LAP_LABELS_NAME, color="magenta"
+    ).source.data = _get_peaks_and_valley_labels_for_lap(reference_lap)
+
     add_starting_line_to_diagram(race_line, last_lap)
 
-    # This is multiple times faster by adding all texts at once rather than adding them above
-    # With around 20 positions, this took 27s before.
-    # Maybe this has something to do with every text being transmitted over network
-    race_line.center.extend(decorations)
 
-    # Add peaks and valleys of last lap
+def _get_peaks_and_valleys_label_set(race_line: figure, name: str, color) -> LabelSet:
+    for renderer in race_line.center:
+        if isinstance(renderer, LabelSet) and renderer.name == name:
+            return renderer
 
+    label_set = LabelSet(
+        name=name,
+        x="x",
+        y="y",
+        text="text",
+        text_align="text_align",
+        text_color=color,
+        text_font_size="10pt",
+        text_font_style="bold",
+        background_fill_color="white",
+        background_fill_alpha=0.75,
+        source=ColumnDataSource(data=_empty_peaks_and_valley_labels()),
+    )
+    race_line.add_layout(label_set)
+    return label_set
 
-def _add_peaks_and_valley_decorations_for_lap(
-    lap: Lap, race_line: figure, color, offset
-):
+
+def _empty_peaks_and_valley_labels():
+    return {"x": [], "y": [], "text": [], "text_align": []}
+
+
+def _get_peaks_and_valley_labels_for_lap(lap: Lap):
     (
         peak_speed_data_x,
         peak_speed_data_y,
@@ -148,51 +189,28 @@ def _add_peaks_and_valley_decorations_for_lap(
         valley_speed_data_y,
     ) = lap.get_speed_peaks_and_valleys()
 
-    decorations = []
-
-    for i in range(len(peak_speed_data_x)):
-        # shift 10 px to the left
-        position_x = lap.data_position_x[peak_speed_data_y[i]]
-        position_y = lap.data_position_z[peak_speed_data_y[i]]
-
-        mytext = Label(
-            x=position_x,
-            y=position_y,
-            text_color=color,
-            text_font_size="10pt",
-            text_font_style="bold",
-            x_offset=offset,
-            background_fill_color="white",
-            background_fill_alpha=0.75,
-        )
-        mytext.text = "▴%.0f" % peak_speed_data_x[i]
-
-        decorations.append(mytext)
-
-    for i in range(len(valley_speed_data_x)):
-        position_x = lap.data_position_x[valley_speed_data_y[i]]
-        position_y = lap.data_position_z[valley_speed_data_y[i]]
-
-        mytext = Label(
-            x=position_x,
-            y=position_y,
-            text_color=color,
-            text_font_size="10pt",
-            x_offset=offset,
-            text_font_style="bold",
-            background_fill_color="white",
-            background_fill_alpha=0.75,
-            text_align="right",
-        )
-        mytext.text = "%.0f▾" % valley_speed_data_x[i]
-
-        decorations.append(mytext)
+    indices = [*peak_speed_data_y, *valley_speed_data_y]
+    position_x = lap.data_position_x
+    position_z = lap.data_position_z
 
-    return decorations
+    # Numeric columns given as arrays are sent to the browser as binary
+    # buffers instead of JSON lists
+    return {
+        "x": np.array([position_x[i] for i in indices], dtype=np.float64),
+        "y": np.array([position_z[i] for i in indices], dtype=np.float64),
+        "text": ["▴%.0f" % speed for speed in peak_speed_data_x]
+        + ["%.0f▾" % speed for speed in valley_speed_data_x],
+        "text_align": ["left"] * len(peak_speed_data_x)
+        + ["right"] * len(valley_speed_data_x),
+    }
 
 
 def remove_all_annotation_text_from_figure(f: figure):
-    f.center = [r for r in f.center if not isinstance(r, Label)]
+    center = [r for r in f.center if not isinstance(r, Label)]
+    # Assigning center sends the whole list to the browser, only do so
+    # when there was a Label to remove
+    if len(center) != len(f.center):
+        f.center = center
 
 
 def get_fuel_map_html_table(last_lap: Lap) -> str:
@@ -203,52 +221,46 @@ def get_fuel_map_html_table(last_lap: Lap) -> str:
     """
 
     fuel_maps = gt7helper.get_fuel_on_consumption_by_relative_fuel_levels(last_lap)
-    table = (
+    parts = [
         "<table><tr>"
         "<th title='The fuel level relative to the current one'>Fuel Lvl.</th>"
         "<th title='Fuel consumed'>Fuel Cons.</th>"
         "<th title='Laps remaining with this setting'>Laps Rem.</th>"
         "<th title='Time remaining with this setting' >Time Rem.</th>"
         "<th title='Time Diff to last lap with this setting'>Time Diff</th></tr>"
-    )
+    ]
     for fuel_map in fuel_maps:
         no_fuel_consumption = fuel_map.fuel_consumed_per_lap <= 0
         line_style = ""
         if fuel_map.mixture_setting == 0 and not no_fuel_consumption:
             line_style = "background-color: #444 "
-        table += (
-            "<tr id='fuel_map_row_%d' style='%s'>"
-            "<td style='text-align:center'>%d</td>"
-            "<td style='text-align:center'>%d</td>"
-            "<td style='text-align:center'>%.1f</td>"
-            "<td style='text-align:center'>%s</td>"
-            "<td style='text-align:center'>%s</td>"
-            "</tr>"
-            % (
-                fuel_map.mixture_setting,
-                line_style,
-                fuel_map.mixture_setting,
-                0 if no_fuel_consumption else fuel_map.fuel_consumed_per_lap,
-                0 if no_fuel_consumption else fuel_map.laps_remaining_on_current_fuel,
-                (
-                    "No Fuel"
-                    if no_fuel_consumption
-                    else (
-                        seconds_to_lap_time(
-                            fuel_map.time_remaining_on_current_fuel / 1000
-                        )
-                    )
-                ),
-                (
-                    "Consumption"
-                    if no_fuel_consumption
-                    else (seconds_to_lap_time(fuel_map.lap_time_diff / 1000))
-                ),
+
+        if no_fuel_consumption:
+            fuel_consumed = 0
+            laps_remaining = 0
+            time_remaining = "No Fuel"
+            time_diff = "Consumption"
+        else:
+            fuel_consumed = fuel_map.fuel_consumed_per_lap
+            laps_remaining = fuel_map.laps_remaining_on_current_fuel
+            time_remaining = seconds_to_lap_time(
+                fuel_map.time_remaining_on_current_fuel / 1000
             )
+            time_diff = seconds_to_lap_time(fuel_map.lap_time_diff / 1000)
+
+        mixture_setting = int(fuel_map.mixture_setting)
+        parts.append(
+            f"<tr id='fuel_map_row_{mixture_setting}' style='{line_style}'>"
+            f"<td style='text-align:center'>{mixture_setting}</td>"
+            f"<td style='text-align:center'>{int(fuel_consumed)}</td>"
+            f"<td style='text-align:center'>{laps_remaining:.1f}</td>"
+            f"<td style='text-align:center'>{time_remaining}</td>"
+            f"<td style='text-align:center'>{time_diff}</td>"
+            "</tr>"
         )
-    table += "</table>"
-    table += "<p>Fuel Remaining: <b>%d</b></p>" % last_lap.fuel_at_end
-    return table
+    parts.append("</table>")
+    parts.append(f"<p>Fuel Remaining: <b>{int(last_lap.fuel_at_end)}</b></p>")
+    return "".join(parts)
 
 
 def add_starting_line_to_diagram(race_line: figure, last_lap: Lap):
@@ -274,6 +286,25 @@ def add_starting_line_to_diagram(race_line: figure, last_lap: Lap):
     race_line.center.append(mytext)
 
 
+# Colors of the diff marker by how much slower (negative) the last lap was at a
+# peak or valley than the reference lap
+DIFF_STYLE_FASTER = "color: rgba(0, 0, 255, .3)"  # Blue
+DIFF_STYLE_CLOSE = "color: rgba(0, 255, 0, .3)"  # Green, up to 3 kph slower
+DIFF_STYLE_BEHIND = "color: rgba(251, 192, 147, .3)"  # Orange, up to 10 kph slower
+DIFF_STYLE_SLOWER = "color: rgba(255, 0, 0, .3)"  # Red
+DIFF_STYLE_SIZE_MISMATCH = "text-color: rgba(255, 0, 0, .3)"  # Red
+
+
+def get_speed_diff_style(diff_speed: float) -> str:
+    if diff_speed > 0:
+        return DIFF_STYLE_FASTER
+    if diff_speed >= -3:
+        return DIFF_STYLE_CLOSE
+    if diff_speed >= -10:
+        return DIFF_STYLE_BEHIND
+    return DIFF_STYLE_SLOWER
+
+
 def get_speed_peak_and_valley_diagram(last_lap: Lap, reference_lap: Lap) -> str:
     """
     Returns a html div with the speed peaks and valleys of the last lap and the reference lap
@@ -282,9 +313,11 @@ def get_speed_peak_and_valley_diagram(last_lap: Lap, reference_lap: Lap) -> str:
     :param reference_lap: Lap
     :return: html table with peaks and valleys
     """
-    table = """<table style='border-spacing: 10px; text-align:center'>"""
+    buf = []
+    w = buf.append
+    w("""<table style='border-spacing: 10px; text-align:center'>""")
 
-    table += """<colgroup>
+    w("""<colgroup>
     <col/>
     <col style='border-left: 1px solid #cdd0d4;'/>
     <col/>
@@ -295,88 +328,79 @@ def get_speed_peak_and_valley_diagram(last_lap: Lap, reference_lap: Lap) -> str:
     <col/>
     <col/>
     <col/>
-  </colgroup>"""
+  </colgroup>""")
 
     ll_tuple_list = gt7helper.get_peaks_and_valleys_sorted_tuple_list(last_lap)
     rl_tuple_list = gt7helper.get_peaks_and_valleys_sorted_tuple_list(reference_lap)
+    ll_len = len(ll_tuple_list)
+    rl_len = len(rl_tuple_list)
 
-    max_data = max(len(ll_tuple_list), len(rl_tuple_list))
+    max_data = max(ll_len, rl_len)
 
-    table += "<tr>"
+    w("<tr>")
 
-    table += "<th></th>"
-    table += '<th colspan="4">%s - %s</th>' % ("Last", last_lap.title)
-    table += '<th colspan="4">%s - %s</th>' % ("Ref.", reference_lap.title)
-    table += '<th colspan="2">Diff</th>'
+    w("<th></th>")
+    w('<th colspan="4">%s - %s</th>' % ("Last", last_lap.title))
+    w('<th colspan="4">%s - %s</th>' % ("Ref.", reference_lap.title))
+    w('<th colspan="2">Diff</th>')
 
-    table += "</tr>"
+    w("</tr>")
 
-    table += """<tr>
+    w("""<tr>
     <td></td><td>#</td><td></td><td>Pos.</td><td>Speed</td>
     <td>#</td><td></td><td>Pos.</td><td>Speed</td>
     <td>Pos.</td><td>Speed</td>
-    </tr>"""
+    </tr>""")
 
-    rl_and_ll_are_same_size = len(ll_tuple_list) == len(rl_tuple_list)
+    rl_and_ll_are_same_size = ll_len == rl_len
 
-    i = 0
-    while i < max_data:
+    for i in range(max_data):
         diff_pos = 0
         diff_speed = 0
 
         if rl_and_ll_are_same_size:
             diff_pos = ll_tuple_list[i][1] - rl_tuple_list[i][1]
             diff_speed = ll_tuple_list[i][0] - rl_tuple_list[i][0]
-
-            if diff_speed > 0:
-                diff_style = f"color: rgba(0, 0, 255, .3)"  # Blue
-            elif diff_speed >= -3:
-                diff_style = f"color: rgba(0, 255, 0, .3)"  # Green
-            elif diff_speed >= -10:
-                diff_style = f"color: rgba(251, 192, 147, .3)"  # Orange
-            else:
-                diff_style = f"color: rgba(255, 0, 0, .3)"  # Red
-
+            diff_style = get_speed_diff_style(diff_speed)
         else:
-            diff_style = f"text-color: rgba(255, 0, 0, .3)"  # Red
+            diff_style = DIFF_STYLE_SIZE_MISMATCH
 
-        table += "<tr>"
-        table += f'<td style="width:15px; text-opacity:0.5; {diff_style}">█</td>'
+        w("<tr>")
+        w(f'<td style="width:15px; text-opacity:0.5; {diff_style}">█</td>')
 
-        if len(ll_tuple_list) > i:
-            table += f"""<td>{i+1}</td>
+        if ll_len > i:
+            w(f"""<td>{i+1}</td>
                 <td>{"S" if ll_tuple_list[i][2] == gt7helper.PEAK else "T"}</td>
                 <td>{ll_tuple_list[i][1]:d}</td>
                 <td>{ll_tuple_list[i][0]:.0f}</td>
-            """
+            """)
 
-        if len(rl_tuple_list) > i:
-            table += f"""<td>{i+1}</td>
+        if rl_len > i:
+            w(f"""<td>{i+1}</td>
                 <td>{"S" if rl_tuple_list[i][2] == gt7helper.PEAK else "T"}</td>
                 <td>{rl_tuple_list[i][1]:d}</td>
                 <td>{rl_tuple_list[i][0]:.0f}</td>
-            """
+            """)
 
         if rl_and_ll_are_same_size:
-            table += f"""
+            w(f"""
                 <td>{diff_pos:d}</td>
                 <td>{diff_speed:.0f}</td>
-            """
+            """)
         else:
-            table += f"""
+            w("""
                 <td>-</td>
                 <td>-</td>
-            """
+            """)
 
-        table += "</tr>"
-        i += 1
+        w("</tr>")
 
-    table += "</td>"
-    table += "<td>"
-    table += "</td>"
+    w("</td>")
+    w("<td>")
+    w("</td>")
 
-    table = table + """</table>"""
-    return table
+    w("""</table>""")
+    return "".join(buf)
 
 
 def get_speed_peak_and_valley_diagram_row(
@@ -386,18 +410,18 @@ def get_speed_peak_and_valley_diagram_row(
     valley_speed_data_x,
     valley_speed_data_y,
 ):
-    row = "<tr><th>#</th><th>Peak</th><th>Position</th></tr>"
-    for i, dx in enumerate(peak_speed_data_x):
-        row += "<tr><td>%d.</td><td>%d kph</td><td>%d</td></tr>" % (
-            i + 1,
-            peak_speed_data_x[i],
-            peak_speed_data_y[i],
+    rows = ["<tr><th>#</th><th>Peak</th><th>Position</th></tr>"]
+    for i, (speed, position) in enumerate(zip(peak_speed_data_x, peak_speed_data_y)):
+        rows.append(
+            f"<tr><td>{i + 1}.</td><td>{int(speed)} kph</td>"
+            f"<td>{int(position)}</td></tr>"
         )
-    row += "<tr><th>#</th><th>Valley</th><th>Position</th></tr>"
-    for i, dx in enumerate(valley_speed_data_x):
-        row += "<tr><td>%d.</td><td>%d kph</td><td>%d</td></tr>" % (
-            i + 1,
-            valley_speed_data_x[i],
-            valley_speed_data_y[i],
+    rows.append("<tr><th>#</th><th>Valley</th><th>Position</th></tr>")
+    for i, (speed, position) in enumerate(
+        zip(valley_speed_data_x, valley_speed_data_y)
+    ):
+        rows.append(
+            f"<tr><td>{i + 1}.</td><td>{int(speed)} kph</td>"
+            f"<td>{int(position)}</td></tr>"
         )
-    return row
+    return "".join(rows)
@@ -1,11 +1,13 @@
+import heapq
 import itertools
 import statistics
 
 from datetime import datetime, timezone
+from operator import attrgetter, itemgetter
 from pathlib import Path
-from statistics import StatisticsError
 from typing import Tuple, List
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
@@ -143,9 +145,8 @@ def seconds_to_lap_time(seconds):
         prefix = "-"
         seconds *= -1
 
-    minutes = seconds // 60
-    remaining = seconds % 60
-    return prefix + "{:01.0f}:{:06.3f}".format(minutes, remaining)
+    minutes, remaining = divmod(seconds, 60)
+    return f"{prefix}{minutes:01.0f}:{remaining:06.3f}"
 
 
 def none_ignoring_median(data):
@@ -161,20 +162,7 @@ def none_ignoring_median(data):
     4.0
 
     """
-    # FIXME improve me
-    filtered_data = []
-    for d in data:
-        if d is not None:
-            filtered_data.append(d)
-    filtered_data = sorted(filtered_data)
-    n = len(filtered_data)
-    if n == 0:
-        raise StatisticsError("no median for empty data")
-    if n % 2 == 1:
-        return filtered_data[n // 2]
-    else:
-        i = n // 2
-        return (filtered_data[i - 1] + filtered_data[i]) / 2
+    return statistics.median([d for d in data if d is not None])
 
 
 def get_last_reference_median_lap(
@@ -199,11 +187,24 @@ def get_last_reference_median_lap(
     return last_lap, reference_lap, median_lap
 
 
+# Sort key of laps, attrgetter avoids a Python call per compared lap
+_lap_finish_time_key = attrgetter("lap_finish_time")
+
+
 def get_best_lap(laps: List[Lap]):
     if len(laps) == 0:
         return None
 
-    return sorted(laps, key=lambda x: x.lap_finish_time, reverse=False)[0]
+    return min(laps, key=_lap_finish_time_key)
+
+
+def _column_median(lists: List[list]) -> list:
+    """Median of every position over lists of numbers of possibly different length.
+    Positions beyond the end of a shorter list are ignored, like None values."""
+    data = np.full((len(lists), max(map(len, lists))), np.nan, dtype=np.float64)
+    for row, values in zip(data, lists):
+        row[: len(values)] = values
+    return np.nanmedian(data, axis=0).tolist()
 
 
 def get_median_lap(laps: List[Lap]) -> Lap:
@@ -224,6 +225,9 @@ def get_median_lap(laps: List[Lap]) -> Lap:
         return median_lap
 
     for val in vars(laps[0]):
+        # Private attributes are derived caches, not telemetry
+        if val.startswith("_"):
+            continue
         attributes = []
         for lap in laps:
             if val == "options":
@@ -239,10 +243,13 @@ def get_median_lap(laps: List[Lap]) -> Lap:
             continue
 
         if isinstance(getattr(laps[0], val), list):
-            median_attribute = [
-                none_ignoring_median(k)
-                for k in itertools.zip_longest(*attributes, fillvalue=None)
-            ]
+            if isinstance(attributes[0][0], (int, float)):
+                median_attribute = _column_median(attributes)
+            else:
+                median_attribute = [
+                    none_ignoring_median(k)
+                    for k in itertools.zip_longest(*attributes, fillvalue=None)
+                ]
         else:
             median_attribute = statistics.median(attributes)
         setattr(median_lap, val, median_attribute)
@@ -256,13 +263,16 @@ def get_median_lap(laps: List[Lap]) -> Lap:
 
 
 def filter_max_min_laps(laps: List[Lap], max_lap_time=-1, min_lap_time=-1) -> List[Lap]:
-    if max_lap_time > 0:
-        laps = list(filter(lambda l: l.lap_finish_time <= max_lap_time, laps))
+    if max_lap_time <= 0 and min_lap_time <= 0:
+        return laps
 
-    if min_lap_time > 0:
-        laps = list(filter(lambda l: l.lap_finish_time >= min_lap_time, laps))
+    # Treat an unset limit as unbounded, so both limits are checked in one pass
+    if max_lap_time <= 0:
+        max_lap_time = float("inf")
+    if min_lap_time <= 0:
+        min_lap_time = float("-inf")
 
-    return laps
+    return [lap for lap in laps if min_lap_time <= lap.lap_finish_time <= max_lap_time]
 
 
 def pct(lap, val):
@@ -270,54 +280,55 @@ def pct(lap, val):
     return "%d" % (getattr(lap, val, 0) / lap_ticks * 1000)
 
 
+def table_row_from_lap(lap: Lap, best_lap_time: int) -> dict:
+    """
+    Convert a single Lap object to a row dict for the DataTable.
+    """
+    replay = "Y" if getattr(lap, "is_replay", False) else "N"
+
+    lap_finish_time = getattr(lap, "lap_finish_time", 0)
+    time_diff = ""
+    if best_lap_time == lap_finish_time:
+        pass
+    elif lap_finish_time < best_lap_time:
+        time_diff = "-"
+    elif best_lap_time > 0:
+        time_diff = "+" + seconds_to_lap_time(
+            -1 * (best_lap_time / 1000 - lap_finish_time / 1000)
+        )
+
+    return {
+        "number": getattr(lap, "number", None),
+        "time": seconds_to_lap_time(lap_finish_time / 1000),
+        "diff": time_diff,
+        "timestamp": (
+            getattr(lap, "lap_start_timestamp", "").strftime("%Y-%m-%d %H:%M:%S")
+            if getattr(lap, "lap_start_timestamp", None)
+            else ""
+        ),
+        "replay": replay,
+        "car_name": car_name(getattr(lap, "car_id", None)),
+        "fuelconsumed": "%d" % getattr(lap, "fuel_consumed", 0),
+        "fullthrottle": pct(lap, "full_throttle_ticks"),
+        "throttleandbrake": pct(lap, "throttle_and_brake_ticks"),
+        "fullbrake": pct(lap, "full_brake_ticks"),
+        "nothrottle": pct(lap, "no_throttle_and_no_brake_ticks"),
+        "tyrespinning": pct(lap, "tyres_spinning_ticks"),
+        "tyreoverheated": pct(lap, "tyres_overheated_ticks"),
+    }
+
+
 def pd_data_frame_from_lap(laps: List[Lap], best_lap_time: int) -> pd.DataFrame:
     """
     Convert a list of Lap objects to a pandas DataFrame for the DataTable.
     """
 
-    rows = []
-    for lap in laps:
-        replay = "Y" if getattr(lap, "is_replay", False) else "N"
-
-        lap_finish_time = getattr(lap, "lap_finish_time", 0)
-        time_diff = ""
-        if best_lap_time == lap_finish_time:
-            pass
-        elif lap_finish_time < best_lap_time:
-            time_diff = "-"
-        elif best_lap_time > 0:
-            time_diff = "+" + seconds_to_lap_time(
-                -1 * (best_lap_time / 1000 - lap_finish_time / 1000)
-            )
-
-        rows.append(
-            {
-                "number": getattr(lap, "number", None),
-                "time": seconds_to_lap_time(lap_finish_time / 1000),
-                "diff": time_diff,
-                "timestamp": (
-                    getattr(lap, "lap_start_timestamp", "").strftime(
-                        "%Y-%m-%d %H:%M:%S"
-                    )
-                    if getattr(lap, "lap_start_timestamp", None)
-                    else ""
-                ),
-                "replay": replay,
-                "car_name": car_name(getattr(lap, "car_id", None)),
-                "fuelconsumed": "%d" % getattr(lap, "fuel_consumed", 0),
-                "fullthrottle": pct(lap, "full_throttle_ticks"),
-                "throttleandbrake": pct(lap, "throttle_and_brake_ticks"),
-                "fullbrake": pct(lap, "full_brake_ticks"),
-                "nothrottle": pct(lap, "no_throttle_and_no_brake_ticks"),
-                "tyrespinning": pct(lap, "tyres_spinning_ticks"),
-                "tyreoverheated": pct(lap, "tyres_overheated_ticks"),
-            }
-        )
+    rows = [table_row_from_lap(lap, best_lap_time) for lap in laps]
+    if len(rows) == 0:
+        return pd.DataFrame()
 
-    df = pd.DataFrame(rows)
-    df.reset_index(drop=True)
-
-    return df
+    # Columns are cheaper to build a DataFrame from than row dicts
+    return pd.DataFrame({key: [row[key] for row in rows] for key in rows[0]})
 
 
 def bokeh_tuple_for_list_of_lapfiles(lapfiles: List[LapFile]):
@@ -339,7 +350,7 @@ def get_fuel_on_consumption_by_relative_fuel_levels(lap: Lap) -> List[FuelMap]:
     fuel_consumed_per_lap, laps_remaining, time_remaining = calculate_remaining_fuel(
         lap.fuel_at_start, lap.fuel_at_end, lap.lap_finish_time
     )
-    i = -5
+    lap_finish_time = lap.lap_finish_time
 
     # Source:
     # https://www.gtplanet.net/forum/threads/test-results-fuel-mixture-settings-and-other-fuel-saving-techniques.369387/
@@ -348,34 +359,29 @@ def get_fuel_on_consumption_by_relative_fuel_levels(lap: Lap) -> List[FuelMap]:
 
     relative_fuel_maps = []
 
-    while i <= 5:
+    for i in range(-5, 6):
+        power_percentage = (100 - i * power_per_level_change) / 100
+        consumption_percentage = (100 - i * fuel_consumption_per_level_change) / 100
         relative_fuel_map = FuelMap(
             mixture_setting=i,
-            power_percentage=(100 - i * power_per_level_change) / 100,
-            consumption_percentage=(100 - i * fuel_consumption_per_level_change) / 100,
+            power_percentage=power_percentage,
+            consumption_percentage=consumption_percentage,
         )
 
         relative_fuel_map.fuel_consumed_per_lap = (
-            fuel_consumed_per_lap * relative_fuel_map.consumption_percentage
+            fuel_consumed_per_lap * consumption_percentage
         )
         relative_fuel_map.laps_remaining_on_current_fuel = (
-            laps_remaining
-            + laps_remaining * (1 - relative_fuel_map.consumption_percentage)
+            laps_remaining + laps_remaining * (1 - consumption_percentage)
         )
-
         relative_fuel_map.time_remaining_on_current_fuel = (
-            time_remaining
-            + time_remaining * (1 - relative_fuel_map.consumption_percentage)
-        )
-        relative_fuel_map.lap_time_diff = lap.lap_finish_time * (
-            1 - relative_fuel_map.power_percentage
-        )
-        relative_fuel_map.lap_time_expected = (
-            lap.lap_finish_time + relative_fuel_map.lap_time_diff
+            time_remaining + time_remaining * (1 - consumption_percentage)
         )
+        lap_time_diff = lap_finish_time * (1 - power_percentage)
+        relative_fuel_map.lap_time_diff = lap_time_diff
+        relative_fuel_map.lap_time_expected = lap_finish_time + lap_time_diff
 
         relative_fuel_maps.append(relative_fuel_map)
-        i += 1
 
     return relative_fuel_maps
 
@@ -389,18 +395,16 @@ def get_n_fastest_laps_within_percent_threshold_ignoring_replays(
         if lap.in_race and not lap.is_replay and len(lap.data_speed) > 0
     ]
 
-    if len(filtered_laps) == 0:
+    if len(filtered_laps) == 0 or number_of_laps <= 0:
         return []
 
-    # sort laps by finish time
-    filtered_laps.sort(key=lambda lap: lap.lap_finish_time)
-    fastest_lap = filtered_laps[0]
-    threshold_laps = [
-        lap
-        for lap in filtered_laps
-        if lap.lap_finish_time <= fastest_lap.lap_finish_time * (1 + percent_threshold)
-    ]
-    return threshold_laps[:number_of_laps]
+    # Only the fastest laps can be within the threshold, so there is no
+    # need to sort all of them
+    fastest_laps = heapq.nsmallest(
+        number_of_laps, filtered_laps, key=_lap_finish_time_key
+    )
+    max_lap_finish_time = fastest_laps[0].lap_finish_time * (1 + percent_threshold)
+    return [lap for lap in fastest_laps if lap.lap_finish_time <= max_lap_finish_time]
 
 
 DEFAULT_FASTEST_LAPS_PERCENT_THRESHOLD = 0.05
@@ -420,26 +424,53 @@ def get_variance_for_fastest_laps(
     return variance, fastest_laps
 
 
+def _get_speed_by_distance(lap: Lap) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the distance axis of a lap and the speed at each distance.
+    The arrays are cached on a finished lap, whose data does not change anymore.
+    """
+    cached = getattr(lap, "_speed_by_distance", None)
+    if cached is not None:
+        return cached
+
+    # The distance repeats while the car stands still, keep the first sample
+    # so every lap has strictly increasing distances to interpolate on
+    distance, first_indices = np.unique(
+        lap.get_x_axis_for_distance(), return_index=True
+    )
+    speed_by_distance = (distance, lap.get_data_array("data_speed")[first_indices])
+
+    if lap.lap_finish_time > 0:
+        lap._speed_by_distance = speed_by_distance
+
+    return speed_by_distance
+
+
 def get_variance_for_laps(laps: List[Lap]) -> DataFrame:
+    if len(laps) == 0:
+        return pd.DataFrame(columns=["distance", "speed_variance"])
 
-    dataframe_distance_columns = []
-    merged_df = pd.DataFrame(columns=["distance"])
+    lap_distances = []
+    lap_speeds = []
     for lap in laps:
-        d = {"speed": lap.data_speed, "distance": lap.get_x_axis_for_distance()}
-        df = pd.DataFrame(data=d)
-        dataframe_distance_columns.append(df)
-        merged_df = pd.merge(merged_df, df, on="distance", how="outer")
+        distance, speed = _get_speed_by_distance(lap)
+        lap_distances.append(distance)
+        lap_speeds.append(speed)
 
-    merged_df = merged_df.sort_values(by="distance")
-    merged_df = merged_df.set_index("distance")
+    distances = np.unique(np.concatenate(lap_distances))
 
-    # Interpolate missing values
-    merged_df = merged_df.interpolate()
-    dbs_df = merged_df.std(axis=1).abs()
-    dbs_df = dbs_df.reset_index().rename(columns={"index": "distance"})
-    dbs_df.columns = ["distance", "speed_variance"]
+    # Speed of every lap at every distance, one row per lap. Linear in between,
+    # holding the last speed after the end of a shorter lap.
+    speeds = np.empty((len(laps), len(distances)), dtype=np.float64)
+    for row, distance, speed in zip(speeds, lap_distances, lap_speeds):
+        row[:] = np.interp(distances, distance, speed, left=np.nan)
 
-    return dbs_df
+    if len(laps) > 1:
+        speed_variance = np.nanstd(speeds, axis=0, ddof=1)
+    else:
+        speed_variance = np.full(len(distances), np.nan)
+
+    return pd.DataFrame({"distance": distances, "speed_variance": speed_variance})
 
 
 PEAK = "PEAK"
@@ -454,16 +485,15 @@ def get_peaks_and_valleys_sorted_tuple_list(lap: Lap):
         valley_speed_data_y,
     ) = lap.get_speed_peaks_and_valleys()
 
-    tuple_list = []
-
-    tuple_list += zip(
-        peak_speed_data_x, peak_speed_data_y, [PEAK] * len(peak_speed_data_x)
-    )
-    tuple_list += zip(
-        valley_speed_data_x, valley_speed_data_y, [VALLEY] * len(valley_speed_data_x)
-    )
-
-    tuple_list.sort(key=lambda a: a[1])
+    tuple_list = [
+        *zip(peak_speed_data_x, peak_speed_data_y, [PEAK] * len(peak_speed_data_x)),
+        *zip(
+            valley_speed_data_x,
+            valley_speed_data_y,
+            [VALLEY] * len(valley_speed_data_x),
+        ),
+    ]
+    tuple_list.sort(key=itemgetter(1))
 
     return tuple_list
 
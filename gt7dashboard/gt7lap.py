@@ -3,7 +3,6 @@ import logging
 import pandas as pd
 from scipy.signal import find_peaks
 from datetime import datetime
-from typing import List
 from pandas import DataFrame
 
 from gt7dashboard.gt7car import car_name
@@ -15,6 +14,49 @@ RACE_LINE_BRAKING_MODE = "RACE_LINE_BRAKING_MODE"
 RACE_LINE_THROTTLE_MODE = "RACE_LINE_THROTTLE_MODE"
 RACE_LINE_COASTING_MODE = "RACE_LINE_COASTING_MODE"
 
+# Race line modes and their name in the raceline_{axis}_{name} data columns
+RACE_LINE_MODE_NAMES = (
+    (RACE_LINE_THROTTLE_MODE, "throttle"),
+    (RACE_LINE_BRAKING_MODE, "braking"),
+    (RACE_LINE_COASTING_MODE, "coasting"),
+)
+
+
+def _race_line_mode_mask(mode: str, braking: np.ndarray, throttle: np.ndarray):
+    """Return which ticks are in the given race line mode, None for unknown modes"""
+    if mode == RACE_LINE_BRAKING_MODE:
+        return braking > throttle
+    if mode == RACE_LINE_THROTTLE_MODE:
+        return braking < throttle
+    if mode == RACE_LINE_COASTING_MODE:
+        return (braking == 0) & (throttle == 0)
+    return None
+
+
+def _find_peaks_downsampled(signal: np.ndarray, width: int) -> np.ndarray:
+    """
+    Find peaks at least width ticks wide on every n-th tick of the signal, then move
+    each peak to the highest tick around it in the full signal
+    """
+    step = min(10, max(1, width // 10))
+    peaks, _ = find_peaks(signal[::step], width=width / step)
+    if step == 1:
+        return peaks
+
+    peaks = peaks * step
+    for i, peak in enumerate(peaks):
+        start = max(peak - step, 0)
+        peaks[i] = start + np.argmax(signal[start : peak + step + 1])
+    return peaks
+
+
+def _none_to_nan(values: list) -> list:
+    """Return the values with None replaced by NaN"""
+    if None not in values:
+        return values
+    return [math.nan if value is None else value for value in values]
+
+
 # Set up logging
 logger = logging.getLogger(__name__)
 logger.setLevel(get_log_level())
@@ -91,6 +133,25 @@ class Lap:
         lap_ticks = getattr(self, "lap_ticks", 1) or 1
         return "%d" % (getattr(self, val, 0) / lap_ticks * 1000)
 
+    def get_data_array(self, name: str) -> np.ndarray:
+        """
+        Return the data points of a data_* list as float array.
+        The array is cached once the lap is finished and must not be modified.
+        """
+        cache = getattr(self, "_data_arrays", None)
+        if cache is not None and name in cache:
+            return cache[name]
+
+        array = np.asarray(getattr(self, name), dtype=np.float64)
+
+        # Data of a finished lap does not change anymore
+        if self.lap_finish_time > 0:
+            if cache is None:
+                cache = self._data_arrays = {}
+            cache[name] = array
+
+        return array
+
     def lap_to_dict(self) -> dict:
         """
         Convert a Lap object to a dictionary suitable for the DataTable.
@@ -143,101 +204,88 @@ class Lap:
     def find_speed_peaks_and_valleys(
         self, width: int = 100
     ) -> tuple[list[int], list[int]]:
-        inv_data_speed = [i * -1 for i in self.data_speed]
-        peaks, whatisthis = find_peaks(self.data_speed, width=width)
-        valleys, whatisthis = find_peaks(inv_data_speed, width=width)
-        return list(peaks), list(valleys)
+        speed = self.get_data_array("data_speed")
+        peaks = _find_peaks_downsampled(speed, width)
+        # Valleys are the peaks of the mirrored speed
+        valleys = _find_peaks_downsampled(np.negative(speed), width)
+        return peaks.tolist(), valleys.tolist()
 
-    def mget_speed_peaks_and_valleys(self):
+    def get_speed_peaks_and_valleys(self):
         peaks, valleys = self.find_speed_peaks_and_valleys(width=100)
+        speed = self.get_data_array("data_speed")
 
-        peak_speed_data_x = []
-        peak_speed_data_y = []
+        return (
+            speed[peaks].tolist(),
+            peaks,
+            speed[valleys].tolist(),
+            valleys,
+        )
 
-        valley_speed_data_x = []
-        valley_speed_data_y = []
+    def get_x_axis_for_distance(self) -> np.ndarray:
+        """
+        Return the distance travelled up to every tick.
+        The array is cached once the lap is finished and must not be modified.
+        """
+        x_axis = getattr(self, "_x_axis_for_distance", None)
+        if x_axis is not None:
+            return x_axis
 
-        for p in peaks:
-            peak_speed_data_x.append(self.data_speed[p])
-            peak_speed_data_y.append(p)
+        tick_time = 16.668  # https://www.gtplanet.net/forum/threads/gt7-is-compatible-with-motion-rig.410728/post-13806131
+        speed = self.get_data_array("data_speed")
 
-        for v in valleys:
-            valley_speed_data_x.append(self.data_speed[v])
-            valley_speed_data_y.append(v)
+        increments = speed / 3.6 / 1000 * tick_time
+        # If speed is None (NaN) or 0, we cannot calculate distance
+        increments[np.isnan(speed) | (speed == 0)] = 0.0
 
-        return (
-            peak_speed_data_x,
-            peak_speed_data_y,
-            valley_speed_data_x,
-            valley_speed_data_y,
-        )
+        x_axis = np.zeros(max(len(speed), 1))
+        np.cumsum(increments[1:], out=x_axis[1:])
 
-    def get_speed_peaks_and_valleys(self):
-        (
-            peak_speed_data_x,
-            peak_speed_data_y,
-            valley_speed_data_x,
-            valley_speed_data_y,
-        ) = self.mget_speed_peaks_and_valleys()
+        # Data of a finished lap does not change anymore
+        if self.lap_finish_time > 0:
+            self._x_axis_for_distance = x_axis
 
-        return (
-            peak_speed_data_x,
-            peak_speed_data_y,
-            valley_speed_data_x,
-            valley_speed_data_y,
+        return x_axis
+
+    def get_race_line_coordinates_when_mode_is_active(self, mode: str):
+        """
+        Return the y, x and z positions of the lap as float arrays, with NaN
+        at every tick where the given race line mode is not active.
+        """
+        active = _race_line_mode_mask(
+            mode,
+            self.get_data_array("data_braking"),
+            self.get_data_array("data_throttle"),
         )
+        if active is None:
+            empty = np.empty(0)
+            return empty, empty, empty
 
-    def get_x_axis_for_distance(self) -> List:
-        x_axis = [0.0]
-        tick_time = 16.668  # https://www.gtplanet.net/forum/threads/gt7-is-compatible-with-motion-rig.410728/post-13806131
-        for i in range(1, len(self.data_speed)):
-            if self.data_speed[i] is None or self.data_speed[i] == 0:
-                # If speed is None or 0, we cannot calculate distance
-                x_axis.append(x_axis[i - 1])
-                continue
-            increment = (float(self.data_speed[i]) / 3.6 / 1000) * tick_time
-            x_axis.append(x_axis[i - 1] + increment)
+        return (
+            np.where(active, self.get_data_array("data_position_y"), np.nan),
+            np.where(active, self.get_data_array("data_position_x"), np.nan),
+            np.where(active, self.get_data_array("data_position_z"), np.nan),
+        )
 
-        return x_axis
+    def _get_race_line_data(self) -> dict:
+        """
+        Return the raceline_{y,x,z}_{mode} columns of all race line modes,
+        reading the braking, throttle and position data only once.
+        """
+        braking = self.get_data_array("data_braking")
+        throttle = self.get_data_array("data_throttle")
+        positions = {
+            axis: self.get_data_array("data_position_%s" % axis)
+            for axis in ("y", "x", "z")
+        }
 
-    def get_race_line_coordinates_when_mode_is_active(self, mode: str):
-        return_y = []
-        return_x = []
-        return_z = []
-
-        for i, _ in enumerate(self.data_braking):
-
-            if mode == RACE_LINE_BRAKING_MODE:
-                if self.data_braking[i] > self.data_throttle[i]:
-                    return_y.append(self.data_position_y[i])
-                    return_x.append(self.data_position_x[i])
-                    return_z.append(self.data_position_z[i])
-                else:
-                    return_y.append("NaN")
-                    return_x.append("NaN")
-                    return_z.append("NaN")
-
-            if mode == RACE_LINE_THROTTLE_MODE:
-                if self.data_braking[i] < self.data_throttle[i]:
-                    return_y.append(self.data_position_y[i])
-                    return_x.append(self.data_position_x[i])
-                    return_z.append(self.data_position_z[i])
-                else:
-                    return_y.append("NaN")
-                    return_x.append("NaN")
-                    return_z.append("NaN")
-
-            if mode == RACE_LINE_COASTING_MODE:
-                if self.data_braking[i] == 0 and self.data_throttle[i] == 0:
-                    return_y.append(self.data_position_y[i])
-                    return_x.append(self.data_position_x[i])
-                    return_z.append(self.data_position_z[i])
-                else:
-                    return_y.append("NaN")
-                    return_x.append("NaN")
-                    return_z.append("NaN")
-
-        return return_y, return_x, return_z
+        data = {}
+        for mode, name in RACE_LINE_MODE_NAMES:
+            active = _race_line_mode_mask(mode, braking, throttle)
+            for axis, position in positions.items():
+                data["raceline_%s_%s" % (axis, name)] = np.where(
+                    active, position, np.nan
+                )
+        return data
 
     def get_x_axis_depending_on_mode(self, distance_mode: bool):
         if distance_mode:
@@ -245,57 +293,35 @@ class Lap:
             return self.get_x_axis_for_distance()
         else:
             # Use ticks as length, which is the length of any given data list
-            return list(range(len(self.data_speed)))
-
-    def get_data_dict(self, distance_mode=True) -> dict[str, list]:
-        raceline_y_throttle, raceline_x_throttle, raceline_z_throttle = (
-            self.get_race_line_coordinates_when_mode_is_active(
-                mode=RACE_LINE_THROTTLE_MODE
-            )
-        )
-        raceline_y_braking, raceline_x_braking, raceline_z_braking = (
-            self.get_race_line_coordinates_when_mode_is_active(
-                mode=RACE_LINE_BRAKING_MODE
-            )
-        )
-        raceline_y_coasting, raceline_x_coasting, raceline_z_coasting = (
-            self.get_race_line_coordinates_when_mode_is_active(
-                mode=RACE_LINE_COASTING_MODE
-            )
-        )
+            return np.arange(len(self.data_speed))
 
+    def get_data_dict(self, distance_mode=True) -> dict[str, np.ndarray]:
         if not self.data_throttle:
-            distance = []
+            distance = np.empty(0)
         else:
             distance = self.get_x_axis_depending_on_mode(distance_mode)
 
+        # Columns given as arrays are sent to the browser as binary buffers
+        # instead of JSON lists
+        array = self.get_data_array
         data = {
-            "throttle": self.data_throttle,
-            "brake": self.data_braking,
-            "speed": self.data_speed,
-            "time": self.data_time,
-            "tyres": self.data_tyres,
-            "rpm": self.data_rpm,
-            "boost": self.data_boost,
-            "yaw_rate": self.data_absolute_yaw_rate_per_second,
-            "gear": self.data_gear,
-            "ticks": list(range(len(self.data_speed))),
-            "coast": self.data_coasting,
-            "raceline_y": self.data_position_y,
-            "raceline_x": self.data_position_x,
-            "raceline_z": self.data_position_z,
-            # For a raceline when throttle is engaged
-            "raceline_y_throttle": raceline_y_throttle,
-            "raceline_x_throttle": raceline_x_throttle,
-            "raceline_z_throttle": raceline_z_throttle,
-            # For a raceline when braking is engaged
-            "raceline_y_braking": raceline_y_braking,
-            "raceline_x_braking": raceline_x_braking,
-            "raceline_z_braking": raceline_z_braking,
-            # For a raceline when neither throttle nor brake is engaged
-            "raceline_y_coasting": raceline_y_coasting,
-            "raceline_x_coasting": raceline_x_coasting,
-            "raceline_z_coasting": raceline_z_coasting,
+            "throttle": array("data_throttle"),
+            "brake": array("data_braking"),
+            "speed": array("data_speed"),
+            "time": array("data_time"),
+            "tyres": array("data_tyres"),
+            "rpm": array("data_rpm"),
+            "boost": array("data_boost"),
+            "yaw_rate": array("data_absolute_yaw_rate_per_second"),
+            "gear": array("data_gear"),
+            "ticks": np.arange(len(self.data_speed)),
+            "coast": array("data_coasting"),
+            "raceline_y": array("data_position_y"),
+            "raceline_x": array("data_position_x"),
+            "raceline_z": array("data_position_z"),
+            # Racelines when throttle is engaged, when braking is engaged and
+            # when neither throttle nor brake is engaged
+            **self._get_race_line_data(),
             "distance": distance,
         }
 
@@ -308,29 +334,18 @@ class Lap:
 
         total_distance = 0.0
 
-        # Cache references to avoid attribute lookups
-        pos_x = self.data_position_x
-        pos_y = self.data_position_y
-        pos_z = self.data_position_z
-
-        # Vectorized approach using list comprehension and zip
-        for i in range(1, len(pos_x)):
-            # Skip if any coordinate is None
-            if None in (
-                pos_x[i],
-                pos_y[i],
-                pos_z[i],
-                pos_x[i - 1],
-                pos_y[i - 1],
-                pos_z[i - 1],
-            ):
-                continue
-
-            dx = pos_x[i] - pos_x[i - 1]
-            dy = pos_y[i] - pos_y[i - 1]
-            dz = pos_z[i] - pos_z[i - 1]
-
-            total_distance += math.sqrt(dx * dx + dy * dy + dz * dz)
+        # Replace missing coordinates with NaN once, the loop then only has to
+        # skip steps with a NaN distance
+        pos_x = _none_to_nan(self.data_position_x)
+        pos_y = _none_to_nan(self.data_position_y)
+        pos_z = _none_to_nan(self.data_position_z)
+
+        points = list(zip(pos_x, pos_y, pos_z))
+        for previous, current in zip(points, points[1:]):
+            distance = math.dist(previous, current)
+            # NaN is the only value not equal to itself
+            if distance == distance:
+                total_distance += distance
 
         return total_distance
 
@@ -341,9 +356,9 @@ class Lap:
 
         # Convert to numpy arrays (handles None values automatically)
         try:
-            pos_x = np.array(self.data_position_x, dtype=float)
-            pos_y = np.array(self.data_position_y, dtype=float)
-            pos_z = np.array(self.data_position_z, dtype=float)
+            pos_x = self.get_data_array("data_position_x")
+            pos_y = self.get_data_array("data_position_y")
+            pos_z = self.get_data_array("data_position_z")
 
             # Calculate differences
             dx = np.diff(pos_x)
@@ -365,98 +380,60 @@ class Lap:
         df1 = Lap.get_time_delta_dataframe_for_lap(reference_lap, "reference")
         df2 = Lap.get_time_delta_dataframe_for_lap(comparison_lap, "comparison")
 
-        df = df1.join(df2, how="outer").sort_index().interpolate()
-
-        # After interpolation, we can make the index a normal field and rename it
-        df.reset_index(inplace=True)
-        df = df.rename(columns={"index": "distance"})
-
-        # Convert integer timestamps back to timestamp format
-        s_reference_timestamped = pd.to_timedelta(getattr(df, "reference"))
-        s_comparison_timestamped = pd.to_timedelta(getattr(df, "comparison"))
+        # Look up both laps' times on the union of their distances. Before a
+        # lap's first distance there is no time (NaN), after its last distance
+        # the last time is kept.
+        distance = np.union1d(df1.index.values, df2.index.values)
+        reference = np.interp(
+            distance, df1.index.values, df1["reference"].values, left=np.nan
+        )
+        comparison = np.interp(
+            distance, df2.index.values, df2["comparison"].values, left=np.nan
+        )
 
-        df["reference"] = s_reference_timestamped
-        df["comparison"] = s_comparison_timestamped
+        df = DataFrame(
+            {
+                "distance": distance,
+                "reference": pd.to_timedelta(reference),
+                "comparison": pd.to_timedelta(comparison),
+            }
+        )
 
         df["timedelta"] = df["comparison"] - df["reference"]
         return df
 
     def get_brake_points(self):
-        """Get brake points with optimized performance using NumPy"""
+        """Get the x and z positions where the brake starts being pressed"""
         if len(self.data_braking) < 2:
             return [], []
 
-        try:
-            # Convert to numpy arrays for vectorized operations
-            braking = np.array(self.data_braking, dtype=float)
-            pos_x = np.array(self.data_position_x, dtype=float)
-            pos_z = np.array(self.data_position_z, dtype=float)
-
-            # Vectorized brake point detection: prev==0 and curr>0
-            brake_start_mask = (braking[:-1] == 0) & (braking[1:] > 0)
-            brake_indices = np.where(brake_start_mask)[0] + 1
+        braking = self.get_data_array("data_braking")
 
-            # Extract coordinates at brake points
-            x = pos_x[brake_indices].tolist()
-            y = pos_z[brake_indices].tolist()
+        # Brake points are ticks with braking after a tick without braking
+        brake_start_mask = (braking[:-1] == 0) & (braking[1:] > 0)
+        brake_indices = np.flatnonzero(brake_start_mask) + 1
 
-            return x, y
-
-        except (ValueError, TypeError) as e:
-            logger.warning(f"NumPy brake point detection failed: {e}, using fallback")
-            return self._get_brake_points_fallback()
-
-    def _get_brake_points_fallback(self):
-        """Fallback optimized Python version"""
-        if len(self.data_braking) < 2:
-            return [], []
-
-        # Cache attribute references
-        braking = self.data_braking
-        pos_x = self.data_position_x
-        pos_z = self.data_position_z
-
-        x = []
-        y = []
-        prev_brake = braking[0]
-
-        for i in range(1, len(braking)):
-            curr_brake = braking[i]
-            if prev_brake == 0 and curr_brake > 0:
-                x.append(pos_x[i])
-                y.append(pos_z[i])
-            prev_brake = curr_brake
+        x = self.get_data_array("data_position_x")[brake_indices].tolist()
+        y = self.get_data_array("data_position_z")[brake_indices].tolist()
 
         return x, y
 
     @staticmethod
     def get_time_delta_dataframe_for_lap(lap: "Lap", name: str) -> DataFrame:
         lap_distance = lap.get_x_axis_for_distance()
-        lap_time = lap.data_time
-
-        # Multiply to match datatype which is nanoseconds?
-        lap_time_ms = [lap.convert_seconds_to_milliseconds(item) for item in lap_time]
-
-        series = pd.Series(lap_distance, index=pd.to_timedelta(lap_time_ms, unit="ms"))
-
-        upsample = series.resample("10ms").asfreq()
-        interpolated_upsample = upsample.interpolate()
-
-        # Make distance to index and time to value, because we want to join on distance
-        inverted = pd.Series(
-            interpolated_upsample.index.values, index=interpolated_upsample
+        lap_time_ms = lap.convert_seconds_to_milliseconds(
+            lap.get_data_array("data_time")
         )
 
-        # Flip around, we have to convert timedelta back to integer to do this
-        s1 = pd.Series(inverted.values.astype("int64"), name=name, index=inverted.index)
+        # Sample the distance travelled every 10ms
+        t_grid = np.arange(lap_time_ms[0], lap_time_ms[-1] + 1, 10.0)
+        distance = np.interp(t_grid, lap_time_ms, lap_distance)
 
-        df1 = DataFrame(data=s1)
-        # returns a dataframe where index is distance travelled and first data field is time passed
-        return df1
+        # returns a dataframe where index is distance travelled and first data field
+        # is time passed in nanoseconds
+        return DataFrame({name: (t_grid * 1e6).astype("int64")}, index=distance)
 
     @staticmethod
-    def convert_seconds_to_milliseconds(seconds: int):
-        minutes = seconds // 60
-        remaining = seconds % 60
-
-        return minutes * 60000 + remaining * 1000
+    def convert_seconds_to_milliseconds(seconds):
+        # Works on single values as well as on numpy arrays
+        return seconds * 1000
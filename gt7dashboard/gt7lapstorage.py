@@ -80,7 +80,15 @@ def save_laps_to_json(laps: List[Lap]) -> str:
     path = os.path.join(os.getcwd(), storage_folder, storage_filename)
 
     with open(path, "w") as f:
-        json.dump([ob.__dict__ for ob in laps], f, default=str)
+        # Private attributes are derived caches and are not persisted
+        json.dump(
+            [
+                {k: v for k, v in ob.__dict__.items() if not k.startswith("_")}
+                for ob in laps
+            ],
+            f,
+            default=str,
+        )
 
     return path
 
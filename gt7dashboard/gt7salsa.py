@@ -1,20 +1,61 @@
+import struct
+from typing import Optional
+
 from Crypto.Cipher import Salsa20
 
+# Salsa20 key, the cipher uses only the first 32 bytes
+_KEY = b"Simulator Interface Packet GT7 ver 0.0"[0:32]
+# "G7S0" at the start of every decrypted packet
+_MAGIC = 0x47375330
 
-# data stream decoding
-def salsa20_dec(dat):
-    key = b"Simulator Interface Packet GT7 ver 0.0"
+# Little endian seed IV / magic word and the nonce built from the seed IV
+_UINT32_STRUCT = struct.Struct("<I")
+_NONCE_STRUCT = struct.Struct("<II")
+_INT32_STRUCT = struct.Struct("<i")
+
+# Package id at 0x70, decrypting up to its end allows to skip stale packets
+_PACKAGE_ID_OFFSET = 0x70
+_HEADER_END = _PACKAGE_ID_OFFSET + 4
+
+
+def _cipher_for_packet(dat) -> Salsa20.Salsa20Cipher:
     # Seed IV is always located here
-    oiv = dat[0x40:0x44]
-    iv1 = int.from_bytes(oiv, byteorder="little")
+    (iv1,) = _UINT32_STRUCT.unpack_from(dat, 0x40)
     # Notice DEADBEAF, not DEADBEEF
     iv2 = iv1 ^ 0xDEADBEAF
-    iv = bytearray()
-    iv.extend(iv2.to_bytes(4, "little"))
-    iv.extend(iv1.to_bytes(4, "little"))
-    cipher = Salsa20.new(key[0:32], bytes(iv))
-    ddata = cipher.decrypt(dat)
-    magic = int.from_bytes(ddata[0:4], byteorder="little")
-    if magic != 0x47375330:
+    return Salsa20.new(_KEY, _NONCE_STRUCT.pack(iv2, iv1))
+
+
+# data stream decoding
+def salsa20_dec(dat):
+    if len(dat) < 0x44:
+        return bytearray(b"")
+    ddata = _cipher_for_packet(dat).decrypt(dat)
+    (magic,) = _UINT32_STRUCT.unpack_from(ddata, 0)
+    if magic != _MAGIC:
         return bytearray(b"")
     return ddata
+
+
+def salsa20_dec_into(dat, out, newer_than: Optional[int] = None) -> memoryview:
+    """
+    Decrypt a packet into the writable buffer out, which may be dat itself.
+    Returns a view of the packet in out, or an empty view for invalid packets.
+    With newer_than, packets whose package id is not greater are rejected
+    after decrypting only the bytes up to the package id.
+    """
+    if len(dat) < _HEADER_END:
+        return memoryview(b"")
+    view = memoryview(out)[: len(dat)]
+    cipher = _cipher_for_packet(dat)
+    cipher.decrypt(dat[:_HEADER_END], output=view[:_HEADER_END])
+    (magic,) = _UINT32_STRUCT.unpack_from(view, 0)
+    if magic != _MAGIC:
+        return memoryview(b"")
+    if newer_than is not None:
+        (package_id,) = _INT32_STRUCT.unpack_from(view, _PACKAGE_ID_OFFSET)
+        if package_id <= newer_than:
+            return memoryview(b"")
+    # The keystream continues where the header decryption stopped
+    cipher.decrypt(dat[_HEADER_END:], output=view[_HEADER_END:])
+    return view
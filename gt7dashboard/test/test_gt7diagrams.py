@@ -3,7 +3,7 @@ import unittest
 
 from bokeh.io import output_file
 from bokeh.layouts import layout
-from bokeh.models import Div
+from bokeh.models import Div, Label, LabelSet
 from bokeh.plotting import save
 
 from gt7dashboard import gt7diagrams, gt7helper
@@ -57,6 +57,69 @@ class TestHelper(unittest.TestCase):
         file_size = os.path.getsize(out_file)
         self.assertAlmostEqual(file_size, 3000000, delta=1000000)
 
+    def test_add_annotations_to_race_line_uses_one_label_set_per_lap(self):
+        race_line = get_throttle_braking_race_line_diagram()[0]
+        reference_lap = self.test_laps[0]
+        last_lap = self.test_laps[1]
+
+        gt7diagrams.add_annotations_to_race_line(race_line, last_lap, reference_lap)
+        # Updating again replaces the labels instead of adding more
+        gt7diagrams.add_annotations_to_race_line(race_line, last_lap, reference_lap)
+
+        label_sets = [r for r in race_line.center if isinstance(r, LabelSet)]
+        self.assertEqual(2, len(label_sets))
+
+        labels = {label_set.name: label_set.source.data for label_set in label_sets}
+        for name, lap in (
+            (gt7diagrams.LAST_LAP_LABELS_NAME, last_lap),
+            (gt7diagrams.REFERENCE_LAP_LABELS_NAME, reference_lap),
+        ):
+            peaks_x, peaks_y, valleys_x, valleys_y = lap.get_speed_peaks_and_valleys()
+            data = labels[name]
+            self.assertEqual(len(peaks_x) + len(valleys_x), len(data["text"]))
+            self.assertEqual(len(data["text"]), len(data["x"]))
+            self.assertEqual(
+                ["left"] * len(peaks_x) + ["right"] * len(valleys_x),
+                data["text_align"],
+            )
+            self.assertEqual(lap.data_position_x[peaks_y[0]], data["x"][0])
+            self.assertEqual("▴%.0f" % peaks_x[0], data["text"][0])
+
+        # Only the starting line is still a single Label
+        self.assertEqual(1, len([r for r in race_line.center if isinstance(r, Label)]))
+
+    def test_remove_all_annotation_text_from_figure(self):
+        race_line = get_throttle_braking_race_line_diagram()[0]
+        center = race_line.center
+
+        gt7diagrams.remove_all_annotation_text_from_figure(race_line)
+        # Nothing to remove, the list is not replaced
+        self.assertIs(center, race_line.center)
+
+        gt7diagrams.add_starting_line_to_diagram(race_line, self.test_laps[0])
+        self.assertEqual(1, len([r for r in race_line.center if isinstance(r, Label)]))
+
+        gt7diagrams.remove_all_annotation_text_from_figure(race_line)
+        self.assertEqual(0, len([r for r in race_line.center if isinstance(r, Label)]))
+        self.assertEqual(
+            2, len([r for r in race_line.center if isinstance(r, LabelSet)])
+        )
+
+    def test_add_annotations_to_race_line_skips_unchanged_laps(self):
+        race_line = get_throttle_braking_race_line_diagram()[0]
+        reference_lap = self.test_laps[0]
+        last_lap = self.test_laps[1]
+
+        gt7diagrams.add_annotations_to_race_line(race_line, last_lap, reference_lap)
+        label_set = race_line.select_one({"name": gt7diagrams.LAST_LAP_LABELS_NAME})
+        data = label_set.source.data
+
+        gt7diagrams.add_annotations_to_race_line(race_line, last_lap, reference_lap)
+        self.assertIs(data, label_set.source.data)
+
+        gt7diagrams.add_annotations_to_race_line(race_line, reference_lap, last_lap)
+        self.assertIsNot(data, label_set.source.data)
+
     def helper_get_race_diagram(self):
         rd = RaceDiagram(600)
 
@@ -226,3 +289,14 @@ class TestHelper(unittest.TestCase):
         print("View file for reference at %s" % out_file)
         output_file(out_file)
         save(layout(div))
+
+    def test_get_speed_diff_style(self):
+        for diff_speed, style in (
+            (0.1, gt7diagrams.DIFF_STYLE_FASTER),
+            (0, gt7diagrams.DIFF_STYLE_CLOSE),
+            (-3, gt7diagrams.DIFF_STYLE_CLOSE),
+            (-3.1, gt7diagrams.DIFF_STYLE_BEHIND),
+            (-10, gt7diagrams.DIFF_STYLE_BEHIND),
+            (-10.1, gt7diagrams.DIFF_STYLE_SLOWER),
+        ):
+            self.assertEqual(style, gt7diagrams.get_speed_diff_style(diff_speed))
@@ -1,10 +1,17 @@
+import math
 import unittest
 import os
 from unittest.mock import patch
 
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks
+
 from gt7dashboard.gt7helper import (
     calculate_remaining_fuel,
     # format_laps_to_table,
+    get_best_lap,
+    pd_data_frame_from_lap,
     get_n_fastest_laps_within_percent_threshold_ignoring_replays,
     get_fuel_on_consumption_by_relative_fuel_levels,
     seconds_to_lap_time,
@@ -16,7 +23,13 @@ from gt7dashboard.gt7helper import (
     calculate_laps_left_on_fuel,
 )
 
-from gt7dashboard.gt7lap import Lap
+from gt7dashboard.gt7lap import (
+    Lap,
+    RACE_LINE_BRAKING_MODE,
+    RACE_LINE_COASTING_MODE,
+    RACE_LINE_MODE_NAMES,
+    RACE_LINE_THROTTLE_MODE,
+)
 from gt7dashboard.gt7car import get_car_name_for_car_id
 from gt7dashboard.gt7lapstorage import (
     get_safe_filename,
@@ -127,11 +140,32 @@ class TestHelper(unittest.TestCase):
 
         print(len(df))
 
+    def test_calculate_time_diff_by_distance_same_lap(self):
+        lap = Lap()
+        lap.data_time = [0, 0.5, 1, 1.5, 2]
+        lap.data_speed = [0, 36, 72, 72, 36]
+
+        df = Lap.calculate_time_diff_by_distance(lap, lap)
+
+        self.assertTrue((np.diff(df.distance) > 0).all())
+        self.assertTrue((df.timedelta == pd.Timedelta(0)).all())
+        self.assertEqual(pd.Timedelta(seconds=2), df.reference.iloc[-1])
+
     def test_convert_seconds_to_milliseconds(self):
         seconds = 10000
         ms = Lap.convert_seconds_to_milliseconds(seconds)
         s_s = seconds_to_lap_time(seconds / 1000)
         print(ms, s_s)
+        self.assertEqual(10000000, ms)
+
+        ms = Lap.convert_seconds_to_milliseconds(np.array([0.5, 61.25]))
+        np.testing.assert_array_equal([500, 61250], ms)
+
+    def test_seconds_to_lap_time(self):
+        self.assertEqual("0:00.000", seconds_to_lap_time(0))
+        self.assertEqual("1:28.465", seconds_to_lap_time(88.465))
+        self.assertEqual("10:00.500", seconds_to_lap_time(600.5))
+        self.assertEqual("-0:01.250", seconds_to_lap_time(-1.25))
 
 
 class TestLastReferenceMedian(unittest.TestCase):
@@ -280,6 +314,13 @@ class TestLaps(unittest.TestCase):
         filtered_laps = filter_max_min_laps(laps, max_lap_time=1270, min_lap_time=600)
         self.assertEqual(3, len(filtered_laps))
 
+        self.assertEqual(laps[:3], filtered_laps)
+        self.assertEqual(
+            [laps[0], laps[1], laps[3]], filter_max_min_laps(laps, max_lap_time=1200)
+        )
+        self.assertEqual(laps[:3], filter_max_min_laps(laps, min_lap_time=1000))
+        self.assertIs(laps, filter_max_min_laps(laps))
+
     def test_find_speed_peaks_and_valleys(self):
         valleyLap = Lap()
         valleyLap.data_speed = [0, 2, 3, 5, 5, 4.5, 3, 6, 7, 8, 7, 8, 3, 2]
@@ -297,6 +338,14 @@ class TestLaps(unittest.TestCase):
         self.assertEqual([759, 1437], peaks)
         self.assertEqual([1132, 1625], valleys)
 
+    def test_find_speed_peaks_and_valleys_matches_full_resolution(self):
+        for lap in self.get_test_laps():
+            speed = np.array(lap.data_speed)
+            peaks, valleys = lap.find_speed_peaks_and_valleys(width=100)
+
+            self.assertEqual(find_peaks(speed, width=100)[0].tolist(), peaks)
+            self.assertEqual(find_peaks(-speed, width=100)[0].tolist(), valleys)
+
     def test_get_car_name_for_car_id(self):
         car_name = get_car_name_for_car_id(1448)
         self.assertEqual("SILVIA spec-R Aero (S15) '02", car_name)
@@ -312,6 +361,35 @@ class TestLaps(unittest.TestCase):
     def test_get_safe_filename(self):
         self.assertEqual("Cio_123_98", get_safe_filename("Cio 123 '98"))
 
+    def test_get_best_lap(self):
+        self.assertIsNone(get_best_lap([]))
+
+        laps = []
+        for lap_finish_time in (1005, 1000, 1100, 1000):
+            lap = Lap()
+            lap.lap_finish_time = lap_finish_time
+            laps.append(lap)
+
+        # The first of equally fast laps wins
+        self.assertIs(laps[1], get_best_lap(laps))
+
+    def test_pd_data_frame_from_lap(self):
+        self.assertTrue(pd_data_frame_from_lap([], 0).empty)
+
+        laps = []
+        for number, lap_finish_time in ((1, 61000), (2, 60500)):
+            lap = Lap()
+            lap.number = number
+            lap.lap_finish_time = lap_finish_time
+            laps.append(lap)
+
+        df = pd_data_frame_from_lap(laps, best_lap_time=60500)
+
+        self.assertEqual([0, 1], list(df.index))
+        self.assertEqual([1, 2], list(df["number"]))
+        self.assertEqual(["1:01.000", "1:00.500"], list(df["time"]))
+        self.assertEqual(["+0:00.500", ""], list(df["diff"]))
+
     def test_get_n_fastest_laps_within_percent_threshold_ignoring_replays(self):
         l1 = Lap()
         l1.lap_finish_time = 1005  # second best
@@ -371,6 +449,48 @@ class TestLaps(unittest.TestCase):
         print("")
         print(variance)
 
+    def test_get_variance_for_more_than_three_laps(self):
+        laps = []
+        for speed in ([0, 0, 100, 110], [0, 200, 300], [0, 150, 200], [0, 90, 0, 95]):
+            lap = Lap()
+            lap.data_speed = speed
+            laps.append(lap)
+
+        variance = get_variance_for_laps(laps)
+
+        self.assertListEqual(["distance", "speed_variance"], list(variance.columns))
+        self.assertTrue(variance["distance"].is_unique)
+        self.assertTrue(variance["distance"].is_monotonic_increasing)
+        self.assertEqual(0, variance["speed_variance"].iloc[0])
+
+    def test_get_variance_for_identical_and_single_laps(self):
+        laps = []
+        for _ in range(2):
+            lap = Lap()
+            lap.data_speed = [0, 100, 120, 120, 90]
+            laps.append(lap)
+
+        variance = get_variance_for_laps(laps)
+        self.assertEqual(len(set(laps[0].get_x_axis_for_distance())), len(variance))
+        self.assertTrue((variance["speed_variance"] == 0).all())
+
+        # A single lap has no variance
+        variance = get_variance_for_laps(laps[:1])
+        self.assertTrue(variance["speed_variance"].isna().all())
+
+    def test_get_variance_for_laps_caches_distance_of_finished_laps(self):
+        laps = self.get_test_laps()[:2]
+        variance = get_variance_for_laps(laps)
+
+        with patch.object(Lap, "get_x_axis_for_distance", side_effect=AssertionError):
+            cached_variance = get_variance_for_laps(laps)
+        self.assertTrue(variance.equals(cached_variance))
+
+        live_lap = Lap()
+        live_lap.data_speed = [0, 100, 120]
+        get_variance_for_laps([live_lap])
+        self.assertFalse(hasattr(live_lap, "_speed_by_distance"))
+
     def test_get_n_fastest_laps_within_percent_threshold_ignoring_replays(self):
         empty_lap = Lap()
         empty_lap.data_speed = []
@@ -425,3 +545,105 @@ class TestLaps(unittest.TestCase):
         self.assertEqual(len(laps), len(laps_read))
         for obj1, obj2 in zip(laps, laps_read):
             self.assertEqual(obj1.__dict__, obj2.__dict__)
+
+    def test_private_lap_attributes_are_not_persisted_or_medianed(self):
+        l1 = Lap()
+        l1.lap_finish_time = 1000
+        l1.data_speed = [100, 200, 150]
+        l1._peak = 200
+        l2 = Lap()
+        l2.lap_finish_time = 1100
+        l2.data_speed = [110, 190, 140]
+
+        median_lap = get_median_lap([l1, l2])
+        self.assertFalse(hasattr(median_lap, "_peak"))
+
+        laps_read = load_laps_from_json(save_laps_to_json([l1, l2]))
+        self.assertFalse(hasattr(laps_read[0], "_peak"))
+
+    def test_get_data_array_is_cached_for_finished_laps_only(self):
+        live_lap = Lap()
+        live_lap.data_speed = [100, 200]
+        self.assertEqual([100, 200], live_lap.get_data_array("data_speed").tolist())
+        live_lap.data_speed.append(150)
+        self.assertEqual(3, len(live_lap.get_data_array("data_speed")))
+
+        finished_lap = Lap()
+        finished_lap.lap_finish_time = 1000
+        finished_lap.data_speed = [100, 200, 150]
+        self.assertIs(
+            finished_lap.get_data_array("data_speed"),
+            finished_lap.get_data_array("data_speed"),
+        )
+
+    def test_get_race_line_coordinates_when_mode_is_active(self):
+        lap = Lap()
+        lap.data_braking = [0, 50, 100, 0]
+        lap.data_throttle = [100, 50, 0, 0]
+        lap.data_position_x = [1.0, 2.0, 3.0, 4.0]
+        lap.data_position_y = [5.0, 6.0, 7.0, 8.0]
+        lap.data_position_z = [9.0, 10.0, 11.0, 12.0]
+
+        for mode, active in (
+            (RACE_LINE_THROTTLE_MODE, [True, False, False, False]),
+            (RACE_LINE_BRAKING_MODE, [False, False, True, False]),
+            (RACE_LINE_COASTING_MODE, [False, False, False, True]),
+        ):
+            y, x, z = lap.get_race_line_coordinates_when_mode_is_active(mode)
+            for data, positions in (
+                (y, lap.data_position_y),
+                (x, lap.data_position_x),
+                (z, lap.data_position_z),
+            ):
+                self.assertEqual(
+                    [p if a else None for p, a in zip(positions, active)],
+                    [None if math.isnan(v) else v for v in data],
+                )
+
+    def test_get_data_dict_race_lines_match_modes(self):
+        lap = self.get_test_laps()[1]
+        data = lap.get_data_dict()
+
+        for mode, name in RACE_LINE_MODE_NAMES:
+            y, x, z = lap.get_race_line_coordinates_when_mode_is_active(mode)
+            np.testing.assert_array_equal(y, data["raceline_y_%s" % name])
+            np.testing.assert_array_equal(x, data["raceline_x_%s" % name])
+            np.testing.assert_array_equal(z, data["raceline_z_%s" % name])
+
+    def test_get_x_axis_for_distance(self):
+        lap = Lap()
+        lap.data_speed = [36, None, 0, 36, 72]
+
+        # The first tick and ticks without speed do not add distance
+        tick_distance = 36 / 3.6 / 1000 * 16.668
+        np.testing.assert_allclose(
+            [0, 0, 0, tick_distance, 3 * tick_distance],
+            lap.get_x_axis_for_distance(),
+        )
+
+        self.assertEqual([0.0], list(Lap().get_x_axis_for_distance()))
+
+    def test_get_x_axis_for_distance_is_cached_for_finished_laps_only(self):
+        live_lap = Lap()
+        live_lap.data_speed = [100, 200]
+        self.assertEqual(2, len(live_lap.get_x_axis_for_distance()))
+        live_lap.data_speed.append(150)
+        self.assertEqual(3, len(live_lap.get_x_axis_for_distance()))
+
+        finished_lap = Lap()
+        finished_lap.lap_finish_time = 1000
+        finished_lap.data_speed = [100, 200, 150]
+        self.assertIs(
+            finished_lap.get_x_axis_for_distance(),
+            finished_lap.get_x_axis_for_distance(),
+        )
+
+    def test_calculate_total_distance_traveled_skips_missing_positions(self):
+        lap = Lap()
+        lap.data_position_x = [0.0, 3.0, 3.0, None, 3.0]
+        lap.data_position_y = [0.0, 0.0, 0.0, 0.0, 0.0]
+        lap.data_position_z = [0.0, 4.0, 8.0, 8.0, 9.0]
+
+        # Only the steps between complete positions are counted
+        self.assertEqual(9.0, lap.calculate_total_distance_traveled())
+        self.assertEqual(9.0, lap.calculate_total_distance_traveled_numpy())